@@ -5,13 +5,50 @@ import click
 import requests
 import json
 
+from mistral_cli_tool import (
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_TOKENS_PER_MINUTE,
+    DEFAULT_MAX_RETRIES,
+)
+from mistral_cli_tool.cache import cache_key, open_cache
+from mistral_cli_tool.rate_limit import RateLimiter, estimate_tokens
+
 
 @click.command()
 @click.argument("prompt", nargs=-1)
 @click.option(
     "--model", default="mistral-small-latest", help="The model to use for the AI call."
 )
-def call_mistral_ai(prompt, model):
+@click.option(
+    "--rpm",
+    type=float,
+    default=DEFAULT_REQUESTS_PER_MINUTE,
+    envvar="MISTRAL_RPM",
+    help="Requests per minute allowed by the API key, 0 for unlimited.",
+)
+@click.option(
+    "--tpm",
+    type=float,
+    default=DEFAULT_TOKENS_PER_MINUTE,
+    envvar="MISTRAL_TPM",
+    help="Tokens per minute allowed by the API key, 0 for unlimited.",
+)
+@click.option(
+    "--max-retries",
+    type=int,
+    default=DEFAULT_MAX_RETRIES,
+    help="Retries on 429/5xx responses.",
+)
+@click.option(
+    "--no-cache", is_flag=True, help="Do not read or write the completion cache."
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    envvar="MISTRAL_CACHE_DIR",
+    help="Completion cache directory.",
+)
+def call_mistral_ai(prompt, model, rpm, tpm, max_retries, no_cache, cache_dir):
     """Call the Mistral AI API with the given prompt."""
     api_key = os.getenv("MISTRAL_AI_KEY")
     if not api_key:
@@ -28,14 +65,37 @@ def call_mistral_ai(prompt, model):
         # Add any other parameters required by the API here
     }
 
-    response = requests.post(url, headers=headers, data=json.dumps(data))
+    cache = open_cache(no_cache, cache_dir)
+    if cache is not None:
+        key = cache_key(model, data["messages"])
+        cached = cache.get(key)
+        if cached is not None:
+            click.echo(json.loads(cached)["content"])
+            return
+
+    def post():
+        response = requests.post(url, headers=headers, data=json.dumps(data))
+        response.raise_for_status()
+        return response
+
+    limiter = RateLimiter(rpm, tpm, max_retries)
+    try:
+        response = limiter.call(
+            post,
+            estimate_tokens(data["messages"]),
+            usage=lambda r: r.json().get("usage", {}).get("total_tokens"),
+        )
+    except requests.HTTPError as e:
+        raise click.ClickException(
+            f"Error: {e.response.status_code} - {e.response.text}"
+        )
 
-    if response.status_code == 200:
-        response_json = response.json()
-        # Adjust the following line based on the actual structure of the API response
-        click.echo(response_json["choices"][0]["message"]["content"])
-    else:
-        raise click.ClickException(f"Error: {response.status_code} - {response.text}")
+    response_json = response.json()
+    # Adjust the following line based on the actual structure of the API response
+    message = response_json["choices"][0]["message"]
+    if cache is not None:
+        cache.put(key, json.dumps(message))
+    click.echo(message["content"])
 
 
 if __name__ == "__main__":
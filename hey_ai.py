@@ -2,19 +2,32 @@
 
 import os
 import json
-import csv
+import contextvars
 import logging
 import sys
 import time
-import math
-from functools import update_wrapper
-import cProfile
-import pstats
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache, update_wrapper
 
 import click
 from dotenv import load_dotenv
 
-from mistralai import Mistral
+from mistral_cli_tool import (
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_TOKENS_PER_MINUTE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_CHUNK_TOKENS,
+)
+from mistral_cli_tool.cache import cache_key, open_cache
+from mistral_cli_tool.rate_limit import RateLimiter, estimate_tokens
+from mistral_cli_tool.tracing import (
+    TRACE_FORMATS,
+    format_duration,
+    profiled,
+    span,
+    tracer,
+)
 
 load_dotenv()
 
@@ -34,15 +47,25 @@ log_levels = {
     "CRITICAL": logging.CRITICAL,
 }
 
-api_key = os.environ["MISTRAL_AI_KEY"]
 
-client = Mistral(api_key=api_key)
+@lru_cache(maxsize=None)
+def get_client():
+    # imported here: the SDK takes most of the start-up time and --help,
+    # cache hits and argument errors never need it
+    with span("client.construct"):
+        from mistralai import Mistral
+
+        return Mistral(api_key=os.environ["MISTRAL_AI_KEY"])
 
 
 def log_decorator(f):
     @click.pass_context
     def new_func(ctx, *args, **kwargs):
-        log.setLevel(log_levels[ctx.params["log_level"]])
+        level = log_levels[ctx.params["log_level"]]
+        log.setLevel(level)
+        # the root logger too: basicConfig above lets everything through at
+        # INFO, including the package's spans, cache and limiter messages
+        logging.getLogger().setLevel(level)
         log.info("Starting")
         r = ctx.invoke(f, *args, **kwargs)
         log.info("Finishing")
@@ -51,21 +74,17 @@ def log_decorator(f):
     return update_wrapper(new_func, f)
 
 
-def time_decorator(f):
+def trace_decorator(f):
     @click.pass_context
     def new_func(ctx, *args, **kwargs):
+        tracer.start(ctx.params["trace_file"], ctx.params["trace_format"])
         t1 = time.perf_counter()
         try:
-            r = ctx.invoke(f, *args, **kwargs)
-            return r
-        except Exception as e:
-            raise e
+            with profiled(ctx.params["profile"]), span("run", command=ctx.info_name):
+                return ctx.invoke(f, *args, **kwargs)
         finally:
-            t2 = time.perf_counter()
-            mins = math.floor(t2 - t1) // 60
-            hours = mins // 60
-            secs = (t2 - t1) - 60 * mins - 3600 * hours
-            log.info(f"Execution in {hours:02d}:{mins:02d}:{secs:0.4f}")
+            log.info(f"Execution in {format_duration(time.perf_counter() - t1)}")
+            tracer.stop()
 
     return update_wrapper(new_func, f)
 
@@ -81,6 +100,104 @@ def time_decorator(f):
     type=click.Path(readable=True, file_okay=True, dir_okay=False),
     default="-",
 )
+@click.option(
+    "--batch",
+    help="Treat the input file as JSONL/CSV with one prompt per line",
+    is_flag=True,
+)
+@click.option(
+    "--chunked",
+    help="Answer the prompt over the input file chunk by chunk, then combine",
+    is_flag=True,
+)
+@click.option(
+    "--summarize",
+    help="Summarize the input file: chunks at once, then a tree of combines",
+    is_flag=True,
+)
+@click.option(
+    "--chunk-tokens",
+    help="Size of one chunk with --chunked and --summarize",
+    type=click.IntRange(min=100),
+    default=DEFAULT_CHUNK_TOKENS,
+    show_default=True,
+)
+@click.option(
+    "--output-file",
+    help="Batch output JSONL [default: STDOUT]",
+    type=click.Path(dir_okay=False, writable=True),
+    default="-",
+)
+@click.option(
+    "--concurrency",
+    help="Requests in flight with --batch, --chunked and --summarize",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+)
+@click.option(
+    "--ordered/--unordered",
+    help="Write batch results in input order",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "--resume",
+    help="Skip prompts already answered in the output file",
+    is_flag=True,
+)
+@click.option(
+    "--rpm",
+    help="Requests per minute allowed by the API key, 0 for unlimited",
+    type=float,
+    default=DEFAULT_REQUESTS_PER_MINUTE,
+    show_default=True,
+    envvar="MISTRAL_RPM",
+)
+@click.option(
+    "--tpm",
+    help="Tokens per minute allowed by the API key, 0 for unlimited",
+    type=float,
+    default=DEFAULT_TOKENS_PER_MINUTE,
+    show_default=True,
+    envvar="MISTRAL_TPM",
+)
+@click.option(
+    "--max-retries",
+    help="Retries on 429/5xx responses",
+    type=int,
+    default=DEFAULT_MAX_RETRIES,
+    show_default=True,
+)
+@click.option(
+    "--no-cache",
+    help="Do not read or write the completion cache",
+    is_flag=True,
+)
+@click.option(
+    "--cache-dir",
+    help="Completion cache directory [default: ~/.cache/mistral_cli_tool]",
+    type=click.Path(file_okay=False),
+    envvar="MISTRAL_CACHE_DIR",
+)
+@click.option(
+    "--trace-file",
+    help="Append per-phase spans to this file",
+    type=click.Path(dir_okay=False, writable=True),
+    envvar="MISTRAL_TRACE_FILE",
+)
+@click.option(
+    "--trace-format",
+    help="Span format, flat JSON lines or OpenTelemetry OTLP/JSON",
+    type=click.Choice(TRACE_FORMATS),
+    default="jsonl",
+    show_default=True,
+)
+@click.option(
+    "--profile",
+    help="Print a cProfile report of the run to stderr",
+    is_flag=True,
+)
 @click.option(
     "--log-level",
     default="WARNING",
@@ -90,29 +207,336 @@ def time_decorator(f):
     envvar="LOG_LEVEL",
 )
 @log_decorator
-@time_decorator
-def main(prompt, model, input_file, log_level):
+@trace_decorator
+def main(
+    prompt,
+    model,
+    input_file,
+    batch,
+    chunked,
+    summarize,
+    chunk_tokens,
+    output_file,
+    concurrency,
+    ordered,
+    resume,
+    rpm,
+    tpm,
+    max_retries,
+    no_cache,
+    cache_dir,
+    trace_file,
+    trace_format,
+    profile,
+    log_level,
+):
     """Console script for hey_ai."""
     # ======================================================================
     #                        Your script starts here!
     # ======================================================================
+    cache = open_cache(no_cache, cache_dir)
+    # one limiter for all batch threads, so together they stay under the limit
+    limiter = RateLimiter(rpm, tpm, max_retries)
+    if batch:
+        run_batch(
+            model,
+            input_file,
+            output_file,
+            concurrency,
+            ordered,
+            resume,
+            limiter,
+            cache,
+        )
+        return 0
+    if chunked:
+        if input_file == "-":
+            raise click.UsageError("--chunked needs --input-file")
+        if not prompt:
+            raise click.UsageError("--chunked needs a prompt to apply to each chunk")
+        reply = run_chunked(
+            model,
+            " ".join(prompt),
+            input_file,
+            chunk_tokens,
+            concurrency,
+            limiter,
+            cache,
+        )
+        with span("output.render"):
+            click.echo(reply)
+        return 0
+    if summarize:
+        if input_file == "-":
+            raise click.UsageError("--summarize needs --input-file")
+        reply = run_summarize(
+            model,
+            " ".join(prompt),
+            input_file,
+            chunk_tokens,
+            concurrency,
+            limiter,
+            cache,
+        )
+        with span("output.render"):
+            click.echo(reply)
+        return 0
     if input_file == "-" and sys.stdin.isatty():
         in_data = " ".join(prompt)
     else:
-        with click.open_file(input_file, "r") as f:
+        with span("input.read"), click.open_file(input_file, "r") as f:
             in_data = f.read()
-    chat_response = client.chat.complete(
-        model=model,
-        messages=[
-            {
-                "role": "user",
-                "content": f"{in_data}",
-            },
-        ],
-    )
-    click.echo(chat_response.choices[0].message.content)
+    reply = ask(model, in_data, cache, limiter)
+    with span("output.render"):
+        click.echo(reply)
     return 0
 
 
+def ask(model, in_data, cache, limiter):
+    messages = [
+        {
+            "role": "user",
+            "content": in_data,
+        },
+    ]
+    if cache is not None:
+        key = cache_key(model, messages)
+        cached = cache.get(key)
+        if cached is not None:
+            return json.loads(cached)["content"]
+    client = get_client()
+    with span("chat.complete", model=model):
+        chat_response = limiter.call(
+            lambda: client.chat.complete(model=model, messages=messages),
+            estimate_tokens(messages),
+        )
+    message = chat_response.choices[0].message
+    if cache is not None:
+        cache.put(key, message.model_dump_json())
+    return message.content
+
+
+def run_chunked(
+    model, instruction, input_file, chunk_tokens, concurrency, limiter, cache
+):
+    """Map-reduce `instruction` over a memory-mapped input file.
+
+    Each chunk is one `ask()` on a pool of `concurrency` threads; see
+    chunking.map_reduce.
+    """
+    import asyncio
+
+    from mistral_cli_tool.chunking import map_reduce, mapped
+
+    async def ask_async(prompt):
+        return await asyncio.get_running_loop().run_in_executor(
+            pool, contextvars.copy_context().run, ask, model, prompt, cache, limiter
+        )
+
+    with span("input.map", path=input_file), mapped(input_file) as buf:
+        with ThreadPoolExecutor(concurrency) as pool:
+            return asyncio.run(
+                map_reduce(buf, instruction, ask_async, chunk_tokens, concurrency)
+            )
+
+
+def run_summarize(
+    model, instruction, input_file, chunk_tokens, concurrency, limiter, cache
+):
+    """Summarize a memory-mapped input file, see chunking.summarize.
+
+    Chunk answers and combines go through the completion cache like any
+    other prompt, so a rerun only asks again for what the edit changed.
+    Prints to stderr the wall time and the time the requests took in total,
+    about what asking one at a time would take.
+    """
+    import asyncio
+
+    from mistral_cli_tool.chunking import SUMMARY_INSTRUCTION, mapped, summarize
+
+    durations = []
+
+    def timed_ask(prompt):
+        t1 = time.perf_counter()
+        try:
+            return ask(model, prompt, cache, limiter)
+        finally:
+            durations.append(time.perf_counter() - t1)
+
+    async def ask_async(prompt):
+        return await asyncio.get_running_loop().run_in_executor(
+            pool, contextvars.copy_context().run, timed_ask, prompt
+        )
+
+    hits = cache.hits if cache is not None else 0
+    t1 = time.perf_counter()
+    with span("input.map", path=input_file), mapped(input_file) as buf:
+        with ThreadPoolExecutor(concurrency) as pool:
+            reply, (chunks, combines) = asyncio.run(
+                summarize(
+                    buf,
+                    instruction or SUMMARY_INSTRUCTION,
+                    ask_async,
+                    chunk_tokens,
+                    concurrency,
+                )
+            )
+    wall = time.perf_counter() - t1
+    sequential = sum(durations)
+    hits = cache.hits - hits if cache is not None else 0
+    click.echo(
+        f"Summarized {chunks} chunks with {combines} combines"
+        f" ({hits} cached) in {format_duration(wall)},"
+        f" requests took {format_duration(sequential)} in total",
+        err=True,
+    )
+    return reply
+
+
+def read_batch(input_file):
+    """Yield (index, record, error) triples from a JSONL or CSV file of prompts.
+
+    JSONL lines are either a string or an object with a "prompt" key, CSV
+    files need a "prompt" column. Other fields ("id", "model") are kept.
+    A line that is not valid JSON comes with a None record and the error.
+    """
+    with click.open_file(input_file, "r") as f:
+        if input_file.endswith(".csv"):
+            import csv
+
+            for index, row in enumerate(csv.DictReader(f)):
+                yield index, row, None
+            return
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                log.error(f"prompt {index} is not valid JSON: {e}")
+                yield index, None, f"invalid JSON: {e}"
+                continue
+            if isinstance(record, str):
+                record = {"prompt": record}
+            elif not isinstance(record, dict):
+                log.error(f"prompt {index} is not a string or an object")
+                yield index, None, "expected a string or an object"
+                continue
+            yield index, record, None
+
+
+def load_done(output_file):
+    """Indexes answered by a previous run, for --resume."""
+    done = set()
+    if output_file == "-" or not os.path.exists(output_file):
+        return done
+    line = ""
+    with open(output_file) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # the last line of a crashed run may be cut short
+                continue
+            if "response" in result:
+                done.add(result["index"])
+    if line and not line.endswith("\n"):
+        with open(output_file, "a") as f:
+            f.write("\n")
+    return done
+
+
+def answer(model, index, record, cache, limiter):
+    result = {"index": index}
+    try:
+        if "id" in record:
+            result["id"] = record["id"]
+        result["response"] = ask(
+            record.get("model") or model, record["prompt"], cache, limiter
+        )
+    except Exception as e:
+        log.error(f"prompt {index} failed: {e}")
+        result["error"] = str(e)
+    return result
+
+
+def run_batch(
+    model, input_file, output_file, concurrency, ordered, resume, limiter, cache
+):
+    """Answer every prompt of `input_file` on a pool of `concurrency` threads.
+
+    Prompts are read lazily and at most a few per worker are queued, so the
+    input can be arbitrarily long. Each result is written and flushed as soon
+    as it is done (or as soon as all earlier ones are, with `ordered`), so
+    the output file doubles as the checkpoint for `resume`.
+    """
+    done = load_done(output_file) if resume else set()
+    if done:
+        log.info(f"resuming, {len(done)} prompts already answered")
+    pending = {}
+    order = deque()
+    finished = {}
+    with click.open_file(
+        output_file, "a" if resume else "w"
+    ) as out, ThreadPoolExecutor(concurrency) as pool:
+
+        def write(result):
+            with span("output.render"):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+
+        def add(result):
+            if not ordered:
+                write(result)
+                return
+            finished[result["index"]] = result
+            while order and order[0] in finished:
+                write(finished.pop(order.popleft()))
+
+        def collect():
+            ready, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in ready:
+                pending.pop(future)
+                add(future.result())
+
+        try:
+            for index, record, error in read_batch(input_file):
+                if index in done:
+                    continue
+                if ordered:
+                    order.append(index)
+                if error is not None:
+                    add({"index": index, "error": error})
+                    continue
+                while len(pending) + len(finished) >= 4 * concurrency:
+                    collect()
+                # copied context, so the spans of each prompt nest under "run"
+                future = pool.submit(
+                    contextvars.copy_context().run,
+                    answer,
+                    model,
+                    index,
+                    record,
+                    cache,
+                    limiter,
+                )
+                pending[future] = index
+            while pending:
+                collect()
+        finally:
+            # on an unexpected error, keep the answers already paid for, out
+            # of order if need be; --resume then only asks for the rest
+            for future in list(pending):
+                if future.cancel():
+                    pending.pop(future)
+            for future in wait(pending).done:
+                if future.exception() is None:
+                    result = future.result()
+                    finished[result["index"]] = result
+            for index in sorted(finished):
+                write(finished.pop(index))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""AIClient start-up with a cold and a warm tool catalogue.
+
+A cold start connects to the MCP server and lists resources and tools; a
+warm start reads the catalogue from disk and makes no MCP calls. Both the
+whole construction and the MCP definitions step alone are reported, the
+former also includes building the Mistral SDK client.
+"""
+
+import asyncio
+import statistics
+import tempfile
+import time
+from asyncio import Queue
+
+import click
+
+from mistral_cli_tool.ai_client import AIClient
+from mistral_cli_tool.catalogue import ToolCatalogue
+from mistral_cli_tool.mcp_server import mcp_server
+
+
+def construct(server, catalogue):
+    t1 = time.perf_counter()
+    AIClient(
+        "stub-key",
+        "stub-model",
+        Queue(),
+        Queue(),
+        mcp_server=server,
+        catalogue=catalogue,
+    )
+    return time.perf_counter() - t1
+
+
+def definitions(client, catalogue):
+    client.catalogue = catalogue
+    t1 = time.perf_counter()
+    asyncio.run(client.get_mcp_definitions())
+    return time.perf_counter() - t1
+
+
+def report(name, cold, warm):
+    click.echo(
+        f"{name:13s} cold p50 {statistics.median(cold) * 1000:7.2f} ms"
+        f"  warm p50 {statistics.median(warm) * 1000:7.2f} ms"
+    )
+
+
+@click.command()
+@click.option("--runs", default=20, show_default=True)
+@click.option("--server", default=None, help="MCP server URL [default: in-process]")
+def main(runs, server):
+    server = server or mcp_server
+    client = AIClient("stub-key", "stub-model", Queue(), Queue(), mcp_server=server)
+    results = {"construction": ([], []), "definitions": ([], [])}
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            catalogue = ToolCatalogue(cache_dir)
+            cold, warm = results["construction"]
+            cold.append(construct(server, catalogue))
+            warm.append(construct(server, catalogue))
+        with tempfile.TemporaryDirectory() as cache_dir:
+            catalogue = ToolCatalogue(cache_dir)
+            cold, warm = results["definitions"]
+            cold.append(definitions(client, catalogue))
+            warm.append(definitions(client, catalogue))
+    for name, (cold, warm) in results.items():
+        report(name, cold, warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Peak RSS of `hey_ai.py --chunked` against input size.
+
+For each size in `--sizes-mb` a log-like file is written, then a child
+process answers a prompt over it with hey_ai's run_chunked (the client is
+pointed at the stub) and reports its peak RSS. With `--whole`, the child
+also sends the file the old way, read into one string and one request.
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from stub_server import StubServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(HERE))
+
+LINE = "2026-10-18 09:{:02d}:{:02d} INFO worker-{} handled request {} in {} ms\n"
+
+
+def write_log(path, size):
+    block = "".join(
+        LINE.format(i % 60, i % 60, i % 8, i, i % 997) for i in range(10000)
+    )
+    block = block.encode()
+    with open(path, "wb") as f:
+        for _ in range(size // len(block) + 1):
+            f.write(block)
+        f.truncate(size)
+
+
+def child(url, path, chunk_tokens, concurrency, whole):
+    sys.path.insert(0, REPO)
+    import hey_ai
+    from mistralai import Mistral
+
+    from mistral_cli_tool.rate_limit import RateLimiter
+
+    hey_ai.get_client = lambda: Mistral(api_key="stub-key", server_url=url)
+    limiter = RateLimiter(0, 0)
+    t1 = time.perf_counter()
+    if whole:
+        with open(path) as f:
+            hey_ai.ask("stub-model", f.read(), None, limiter)
+    else:
+        hey_ai.run_chunked(
+            "stub-model",
+            "Count the errors",
+            path,
+            chunk_tokens,
+            concurrency,
+            limiter,
+            None,
+        )
+    wall = time.perf_counter() - t1
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{peak:.1f} {wall:.2f}")
+
+
+@click.command()
+@click.option("--sizes-mb", default="10,100,400", show_default=True)
+@click.option("--chunk-tokens", default=50000, show_default=True)
+@click.option("--concurrency", default=4, show_default=True)
+@click.option("--whole", is_flag=True, help="Also measure reading the whole file")
+@click.option("--child-args", hidden=True)
+def main(sizes_mb, chunk_tokens, concurrency, whole, child_args):
+    if child_args:
+        url, path, mode = child_args.split("|")
+        child(url, path, chunk_tokens, concurrency, mode == "whole")
+        return
+    modes = ["chunked"] + (["whole"] if whole else [])
+    with StubServer(latency=0.0) as stub, tempfile.TemporaryDirectory() as tmp:
+        for size in [int(s) for s in sizes_mb.split(",")]:
+            path = os.path.join(tmp, f"input-{size}.log")
+            write_log(path, size * 1024 * 1024)
+            for mode in modes:
+                requests = stub.requests
+                out = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--chunk-tokens",
+                        str(chunk_tokens),
+                        "--concurrency",
+                        str(concurrency),
+                        "--child-args",
+                        f"{stub.url}|{path}|{mode}",
+                    ],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout.split()
+                peak, wall = float(out[-2]), float(out[-1])
+                click.echo(
+                    f"{size:5d} MB {mode:8s} peak RSS {peak:8.1f} MB,"
+                    f" {stub.requests - requests:5d} requests, {wall:6.2f}s"
+                )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Resume, list and search times of the conversation store.
+
+Sessions of increasing length are written turn by turn, the way AIClient
+does it, with the history budget keeping the in-memory conversation
+bounded. Resuming from snapshot + log tail is compared with replaying the
+whole log. `--sessions` short sessions are added to time listing and search.
+"""
+
+import tempfile
+import time
+
+import click
+from mistralai.models import AssistantMessage, UserMessage
+
+from mistral_cli_tool.conversations import ConversationStore, message_from_json
+from mistral_cli_tool.history import HistoryBudget
+
+WORDS = "alpha bravo charlie delta echo foxtrot golf hotel india juliet".split()
+
+
+def text(i, words):
+    return " ".join(WORDS[(i * 7 + j) % len(WORDS)] for j in range(words))
+
+
+def write_session(store, session_id, turns, max_history_tokens):
+    messages = []
+    budget = HistoryBudget(max_history_tokens)
+    for i in range(turns):
+        user = UserMessage(content=f"question {i} {text(i, 40)}")
+        messages.append(user)
+        budget.compact(messages)
+        messages.append(AssistantMessage(content=f"answer {i} {text(i, 80)}"))
+        store.append(session_id, messages[-2:], messages, "bench-model")
+
+
+def replay(store, session_id):
+    rows = store.db.execute(
+        "SELECT role, body FROM messages WHERE session_id = ? ORDER BY seq",
+        (session_id,),
+    ).fetchall()
+    return [message_from_json(role, body) for role, body in rows]
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t1 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t1
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+@click.command()
+@click.option("--turns", default="10,100,1000,5000", show_default=True)
+@click.option("--sessions", default=2000, show_default=True)
+@click.option("--max-history-tokens", default=8000, show_default=True)
+def main(turns, sessions, max_history_tokens):
+    with tempfile.TemporaryDirectory() as history_dir:
+        store = ConversationStore(history_dir)
+        for n in [int(t) for t in turns.split(",")]:
+            session_id = f"long{n}"
+            t1 = time.perf_counter()
+            write_session(store, session_id, n, max_history_tokens)
+            per_turn = (time.perf_counter() - t1) / n
+            resume, messages = timed(lambda: store.load(session_id))
+            full, _ = timed(lambda: replay(store, session_id))
+            click.echo(
+                f"{n:5d} turns: append {per_turn * 1e3:6.2f} ms/turn,"
+                f" resume {resume * 1e3:7.2f} ms ({len(messages)} messages),"
+                f" full replay {full * 1e3:8.2f} ms"
+            )
+        for i in range(sessions):
+            write_session(store, f"short{i}", 3, max_history_tokens)
+        listing, rows = timed(lambda: store.list(20))
+        search, matches = timed(lambda: store.search("foxtrot AND question"))
+        click.echo(f"list 20 of {sessions + 4} sessions: {listing * 1e3:6.2f} ms")
+        click.echo(f"search, {len(matches)} matches:  {search * 1e3:6.2f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Completion payload size over a long session, with and without a budget.
+
+Every turn the stub asks for one tool call that returns `--tool-bytes` of
+text, similar to a `simple_get` page body.
+"""
+
+import asyncio
+from asyncio import Queue
+
+import click
+from fastmcp import FastMCP
+
+from mistral_cli_tool.ai_client import AIClient
+from mistral_cli_tool.rate_limit import RateLimiter
+
+from stub_server import StubServer, tool_call
+
+bench_server = FastMCP(name="BenchServer")
+
+
+@bench_server.tool()
+def page(size: int) -> str:
+    return ("lorem ipsum " * (size // 12 + 1))[:size]
+
+
+async def session(client, turns):
+    await client.start_loop()
+    for i in range(turns):
+        await client.single_pass(f"question {i}")
+    await client.mcp_pool.stop()
+
+
+@click.command()
+@click.option("--turns", default=50, show_default=True)
+@click.option("--tool-bytes", default=20000, show_default=True)
+@click.option("--max-history-tokens", default=8000, show_default=True)
+def main(turns, tool_bytes, max_history_tokens):
+    tool_calls = [tool_call("call0", "page", {"size": tool_bytes})]
+    with StubServer(latency=0.0, tool_calls=tool_calls) as stub:
+        for budget in (0, max_history_tokens):
+            client = AIClient(
+                "stub-key",
+                "stub-model",
+                Queue(),
+                Queue(),
+                mcp_server=bench_server,
+                limiter=RateLimiter(0, 0),
+                server_url=stub.url,
+                max_history_tokens=budget,
+            )
+            asyncio.run(session(client, turns))
+            sizes = client.history.payload_bytes
+            # two completions per turn, report the one carrying the tool output
+            per_turn = sizes[1::2]
+            marks = sorted({1, 10, turns // 2, turns} & set(range(1, turns + 1)))
+            click.echo(
+                f"budget {budget or 'none':>6}: "
+                + "  ".join(f"turn {m}: {per_turn[m - 1]:>9d} B" for m in marks)
+                + f"  total {sum(sizes) / 1e6:8.2f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Calls per second of the MCP HTTP tools, new connection vs pooled session.
+
+A local keep-alive HTTP server stands in for the remote sites, so only the
+connection handling differs between the two modes.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+import click
+import requests
+
+from mistral_cli_tool.http_client import get_text
+
+from stub_server import StubHTTPServer
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # send headers and body in one segment, otherwise Nagle and delayed ACKs
+    # add ~40 ms to every request on a kept-alive connection
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b"x" * self.server.body_size
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def unpooled(url):
+    return requests.get(url).text
+
+
+def run(fn, url, calls, threads):
+    t1 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(fn, [url] * calls))
+    return calls / (time.perf_counter() - t1)
+
+
+@click.command()
+@click.option("--calls", default=2000, show_default=True)
+@click.option("--threads", default=4, show_default=True)
+@click.option("--body-size", default=4096, show_default=True)
+def main(calls, threads, body_size):
+    httpd = StubHTTPServer(("127.0.0.1", 0), PageHandler)
+    httpd.daemon_threads = True
+    httpd.body_size = body_size
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    host, port = httpd.server_address[:2]
+    url = f"http://{host}:{port}/page"
+    for name, fn in (("requests.get", unpooled), ("pooled", get_text)):
+        click.echo(f"{name:13s} {run(fn, url, calls, threads):8.0f} calls/s")
+    httpd.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Tool latency of the MCP SSE server under many concurrent sessions.
+
+Starts the server (optionally with several workers) and N clients that each
+hold their own SSE session and call `simple_get` against a local page that
+answers after `--page-latency` seconds. Reports p50/p99 call latency and
+calls per second.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import click
+from fastmcp import Client
+
+from mistral_cli_tool.mcp_workers import free_port, stop, wait_for_port
+
+from stub_server import StubHTTPServer
+
+
+class SlowPageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def session(url, page, calls, latencies):
+    async with Client(url) as client:
+        for _ in range(calls):
+            t1 = time.perf_counter()
+            await client.call_tool("simple_get", {"url": page})
+            latencies.append(time.perf_counter() - t1)
+
+
+async def load(url, page, clients, calls):
+    latencies = []
+    t1 = time.perf_counter()
+    await asyncio.gather(
+        *(session(url, page, calls, latencies) for _ in range(clients))
+    )
+    return latencies, time.perf_counter() - t1
+
+
+@click.command()
+@click.option("--clients", default=50, show_default=True)
+@click.option("--calls", default=20, show_default=True, help="Calls per client")
+@click.option("--workers", default=1, show_default=True)
+@click.option("--page-latency", default=0.05, show_default=True)
+def main(clients, calls, workers, page_latency):
+    httpd = StubHTTPServer(("127.0.0.1", 0), SlowPageHandler)
+    httpd.daemon_threads = True
+    httpd.latency = page_latency
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    page = "http://127.0.0.1:%d/page" % httpd.server_address[1]
+
+    port = free_port("127.0.0.1")
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "mistral_cli_tool.mcp_server",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "WARNING",
+        ],
+        env={**os.environ, "MCP_HTTP_POOL_SIZE": str(max(16, clients))},
+    )
+    try:
+        wait_for_port("127.0.0.1", port)
+        url = f"http://127.0.0.1:{port}/sse"
+        latencies, elapsed = asyncio.run(load(url, page, clients, calls))
+    finally:
+        stop(server)
+        httpd.shutdown()
+    click.echo(
+        f"{clients} clients x {calls} calls, {workers} worker(s):"
+        f" p50 {percentile(latencies, 0.5) * 1000:.1f} ms,"
+        f" p99 {percentile(latencies, 0.99) * 1000:.1f} ms,"
+        f" {len(latencies) / elapsed:.0f} calls/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Tool-call latency with a fresh MCP connection per call vs the session pool.
+
+Uses the in-process MCP server by default; pass `--server` with an SSE URL
+(e.g. http://localhost:8000/sse) to measure the real transport.
+"""
+
+import asyncio
+import statistics
+import time
+
+import click
+from fastmcp import Client
+
+from mistral_cli_tool.mcp_pool import MCPSessionPool
+from mistral_cli_tool.mcp_server import mcp_server
+
+
+async def fresh(server, calls, tool):
+    latencies = []
+    for _ in range(calls):
+        t1 = time.perf_counter()
+        async with Client(server) as client:
+            await client.call_tool(tool, arguments={})
+        latencies.append(time.perf_counter() - t1)
+    return latencies, {"handshakes": calls, "handshakes_saved": 0}
+
+
+async def pooled(server, calls, tool):
+    pool = MCPSessionPool(server)
+    await pool.start()
+    latencies = []
+    for _ in range(calls):
+        t1 = time.perf_counter()
+        await pool.call_tool(tool, arguments={})
+        latencies.append(time.perf_counter() - t1)
+    await pool.stop()
+    return latencies, pool.stats.as_dict()
+
+
+def report(name, latencies, stats):
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    click.echo(
+        f"{name:7s} p50 {statistics.median(latencies) * 1000:7.2f} ms"
+        f"  p95 {p95 * 1000:7.2f} ms"
+        f"  handshakes {stats['handshakes']:4d}"
+        f"  saved {stats['handshakes_saved']:4d}"
+    )
+
+
+@click.command()
+@click.option("--calls", default=200, show_default=True)
+@click.option("--tool", default="time", show_default=True)
+@click.option("--server", default=None, help="MCP server URL [default: in-process]")
+def main(calls, tool, server):
+    server = server or mcp_server
+    report("fresh", *asyncio.run(fresh(server, calls, tool)))
+    report("pooled", *asyncio.run(pooled(server, calls, tool)))
+
+
+if __name__ == "__main__":
+    main()
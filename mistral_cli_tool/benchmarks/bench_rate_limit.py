@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Throughput and 429s of a batch against a rate-limited endpoint.
+
+The stub answers at most `--limit-rps` requests per second (one second of
+burst) and sends 429 with Retry-After above that. `--threads` workers send
+`--requests` completions through a shared RateLimiter, either paced at the
+limit or with `--no-pacing` (retry/backoff only, like the old batch mode).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from mistralai import Mistral
+
+from mistral_cli_tool.rate_limit import RateLimiter
+
+from stub_server import StubHandler, StubServer
+
+
+class LimitedHandler(StubHandler):
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            now = time.monotonic()
+            server.allowance = min(
+                server.limit, server.allowance + (now - server.stamp) * server.limit
+            )
+            server.stamp = now
+            allowed = server.allowance >= 1
+            if allowed:
+                server.allowance -= 1
+            else:
+                server.rejected += 1
+        if allowed:
+            return super().do_POST()
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"message": "Requests rate limit exceeded"}'
+        self.send_response(429)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run(url, limiter, requests, threads):
+    client = Mistral(api_key="stub-key", server_url=url)
+    messages = [{"role": "user", "content": "hello"}]
+    failed = 0
+
+    def one(_):
+        nonlocal failed
+        try:
+            limiter.call(
+                lambda: client.chat.complete(model="stub-model", messages=messages)
+            )
+        except Exception:
+            failed += 1
+
+    t1 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, range(requests)))
+    return time.perf_counter() - t1, failed
+
+
+@click.command()
+@click.option("--requests", default=200, show_default=True)
+@click.option("--threads", default=16, show_default=True)
+@click.option("--limit-rps", default=20.0, show_default=True)
+@click.option("--latency", default=0.05, show_default=True)
+@click.option("--max-retries", default=5, show_default=True)
+@click.option("--no-pacing", is_flag=True, help="Only retry, do not pace")
+def main(requests, threads, limit_rps, latency, max_retries, no_pacing):
+    rpm = 0 if no_pacing else limit_rps * 60
+    limiter = RateLimiter(rpm, 0, max_retries)
+    with StubServer(latency=latency, handler=LimitedHandler) as stub:
+        stub.httpd.lock = threading.Lock()
+        stub.httpd.limit = limit_rps
+        stub.httpd.allowance = limit_rps
+        stub.httpd.stamp = time.monotonic()
+        stub.httpd.rejected = 0
+        wall, failed = run(stub.url, limiter, requests, threads)
+        rejected = stub.httpd.rejected
+    click.echo(f"mode:         {'retry only' if no_pacing else 'paced'}")
+    click.echo(f"limit:        {limit_rps:0.1f} req/s")
+    click.echo(f"throughput:   {(requests - failed) / wall:0.1f} req/s")
+    click.echo(f"429s:         {rejected}")
+    click.echo(f"failed:       {failed} of {requests}")
+
+
+if __name__ == "__main__":
+    main()
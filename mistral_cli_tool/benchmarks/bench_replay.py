@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""AIClient overhead, memory and throughput on a replayed transcript.
+
+Runs fully offline: completions come from ReplayHandler, tool calls from the
+replay MCP server (see replay.py), both with configurable latency.
+
+- overhead: the transcript is replayed `--repeat` times, each time as a new
+  conversation; per turn, the wall time minus the injected completion and
+  tool latency is the time spent in the client itself.
+- memory: one session runs `--long-turns` turns without latency under
+  tracemalloc; reports how the traced memory and `messages` grow.
+- throughput: `--sessions` sessions replay the transcript at once through
+  one SessionManager; reports turns/s.
+
+Results are compared with a stored baseline (`--baseline`); the exit status
+is 1 if a metric got worse by more than `--tolerance`. Baselines depend on
+the machine, record one with `--save-baseline` before comparing.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from asyncio import Queue
+
+import click
+
+from mistral_cli_tool.ai_client import AIClient
+from mistral_cli_tool.history import DEFAULT_MAX_HISTORY_TOKENS
+from mistral_cli_tool.rate_limit import RateLimiter
+from mistral_cli_tool.sessions import SessionManager
+
+from replay import Transcript, replay_mcp_server, replay_stub
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TRANSCRIPT = os.path.join(HERE, "transcripts", "olomouc_day_trip.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baselines", "bench_replay.json")
+
+# metric: (True if higher is better, absolute noise floor)
+METRICS = {
+    "overhead_p50_ms": (False, 0.5),
+    "overhead_p99_ms": (False, 1.0),
+    "memory_kb_per_turn": (False, 4.0),
+    "messages_kb": (False, 1.0),
+    "throughput_turns_s": (True, 0.0),
+}
+
+
+def make_client(transcript, stub, mcp_server, max_history_tokens):
+    return AIClient(
+        "replay-key",
+        transcript.model,
+        Queue(),
+        Queue(),
+        mcp_server=mcp_server,
+        limiter=RateLimiter(0, 0),
+        server_url=stub.url,
+        max_history_tokens=max_history_tokens,
+    )
+
+
+def tool_rounds(messages, start):
+    return sum(1 for m in messages[start:] if getattr(m, "tool_calls", None))
+
+
+async def replay_turns(client, conversations, on_turn):
+    """Run each list of queries as a new conversation of `client`."""
+    await client.mcp_pool.start()
+    for queries in conversations:
+        client.messages = []
+        for query in queries:
+            t1 = time.perf_counter()
+            await client.single_pass(query)
+            elapsed = time.perf_counter() - t1
+            await client.output_queue.get()
+            on_turn(client, elapsed)
+    await client.mcp_pool.stop()
+
+
+def measure_overhead(transcript, stub, latency, tool_latency, repeat, budget):
+    mcp_server = replay_mcp_server(transcript, tool_latency)
+    client = make_client(transcript, stub, mcp_server, budget)
+    overheads = []
+    last = [stub.requests]
+
+    def on_turn(client, elapsed):
+        completions = stub.requests - last[0]
+        last[0] = stub.requests
+        # compaction may have dropped older turns, the new one is at the end
+        start = max(i for i, m in enumerate(client.messages) if m.role == "user")
+        waited = completions * latency
+        waited += tool_rounds(client.messages, start) * tool_latency
+        overheads.append(elapsed - waited)
+
+    asyncio.run(replay_turns(client, [transcript.queries] * repeat, on_turn))
+    overheads.sort()
+    return {
+        "overhead_p50_ms": statistics.median(overheads) * 1000,
+        "overhead_p99_ms": overheads[int(0.99 * (len(overheads) - 1))] * 1000,
+    }
+
+
+def measure_memory(transcript, stub, long_turns, budget):
+    mcp_server = replay_mcp_server(transcript)
+    client = make_client(transcript, stub, mcp_server, budget)
+    queries = (transcript.queries * (long_turns // len(transcript.queries) + 1))[
+        :long_turns
+    ]
+    traced = []
+
+    def on_turn(client, elapsed):
+        traced.append(tracemalloc.get_traced_memory()[0])
+
+    tracemalloc.start()
+    try:
+        asyncio.run(replay_turns(client, [queries], on_turn))
+    finally:
+        tracemalloc.stop()
+    half = len(traced) // 2
+    per_turn = (traced[-1] - traced[half]) / max(1, len(traced) - 1 - half)
+    size = sum(len(m.model_dump_json()) for m in client.messages)
+    return {
+        "memory_kb_per_turn": per_turn / 1024,
+        "messages_kb": size / 1024,
+        "messages": len(client.messages),
+    }
+
+
+async def replay_sessions(manager, queries, sessions):
+    async def one(session_id):
+        for query in queries:
+            await manager.ask(session_id, query)
+
+    await manager.start()
+    t1 = time.perf_counter()
+    await asyncio.gather(*[one(f"replay-{i}") for i in range(sessions)])
+    wall = time.perf_counter() - t1
+    await manager.stop()
+    return wall
+
+
+def measure_throughput(transcript, stub, tool_latency, sessions, budget):
+    mcp_server = replay_mcp_server(transcript, tool_latency)
+    client = make_client(transcript, stub, mcp_server, budget)
+    manager = SessionManager(client, max_history_tokens=budget)
+    wall = asyncio.run(replay_sessions(manager, transcript.queries, sessions))
+    return {"throughput_turns_s": sessions * len(transcript.queries) / wall}
+
+
+def compare(results, baseline, tolerance):
+    """Print results against the baseline; names of the metrics that regressed."""
+    regressed = []
+    for name, (higher_better, floor) in METRICS.items():
+        value = results[name]
+        base = baseline.get(name)
+        if base is None:
+            click.echo(f"{name:20s} {value:10.2f}")
+            continue
+        worse = base - value if higher_better else value - base
+        flag = ""
+        if worse > tolerance * abs(base) + floor:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        click.echo(f"{name:20s} {value:10.2f}   baseline {base:10.2f}{flag}")
+    return regressed
+
+
+@click.command()
+@click.option(
+    "--transcript",
+    type=click.Path(exists=True, dir_okay=False),
+    default=DEFAULT_TRANSCRIPT,
+    show_default=True,
+)
+@click.option("--latency", default=0.05, show_default=True, help="Completion [s]")
+@click.option("--tool-latency", default=0.02, show_default=True, help="Tool [s]")
+@click.option("--repeat", default=20, show_default=True)
+@click.option("--long-turns", default=300, show_default=True)
+@click.option("--sessions", default=20, show_default=True)
+@click.option(
+    "--max-history-tokens", default=DEFAULT_MAX_HISTORY_TOKENS, show_default=True
+)
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False),
+    default=DEFAULT_BASELINE,
+    show_default=True,
+)
+@click.option("--save-baseline", is_flag=True, help="Store these results")
+@click.option("--tolerance", default=0.3, show_default=True)
+def main(
+    transcript,
+    latency,
+    tool_latency,
+    repeat,
+    long_turns,
+    sessions,
+    max_history_tokens,
+    baseline,
+    save_baseline,
+    tolerance,
+):
+    params = {
+        "transcript": os.path.basename(transcript),
+        "latency": latency,
+        "tool_latency": tool_latency,
+        "repeat": repeat,
+        "long_turns": long_turns,
+        "sessions": sessions,
+        "max_history_tokens": max_history_tokens,
+    }
+    transcript = Transcript(transcript)
+    results = {}
+    with replay_stub(transcript, latency) as stub:
+        results.update(
+            measure_overhead(
+                transcript, stub, latency, tool_latency, repeat, max_history_tokens
+            )
+        )
+    with replay_stub(transcript, 0.0) as stub:
+        results.update(measure_memory(transcript, stub, long_turns, max_history_tokens))
+    with replay_stub(transcript, latency) as stub:
+        results.update(
+            measure_throughput(
+                transcript, stub, tool_latency, sessions, max_history_tokens
+            )
+        )
+    click.echo(f"{results['messages']} messages kept after {long_turns} turns")
+
+    if save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline)), exist_ok=True)
+        with open(baseline, "w") as f:
+            json.dump({"params": params, "metrics": results}, f, indent=1)
+        compare(results, {}, tolerance)
+        click.echo(f"baseline saved to {baseline}")
+        return
+    stored = {}
+    if os.path.exists(baseline):
+        with open(baseline) as f:
+            stored = json.load(f)
+        if stored.get("params") != params:
+            click.echo("baseline was recorded with other parameters, not comparing")
+            stored = {}
+    regressed = compare(results, stored.get("metrics", {}), tolerance)
+    if regressed:
+        click.echo(f"{len(regressed)} metric(s) regressed by more than {tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Many conversations through one SessionManager.
+
+One "busy" session queues `--backlog` turns at once, then `--sessions` other
+sessions ask one question each. Reports the latency of the single-question
+sessions (they should not wait behind the backlog) and overall turns/s.
+"""
+
+import asyncio
+import statistics
+import time
+from asyncio import Queue
+
+import click
+
+from mistral_cli_tool.ai_client import AIClient
+from mistral_cli_tool.rate_limit import RateLimiter
+from mistral_cli_tool.sessions import SessionManager
+
+from stub_server import StubServer
+
+
+async def timed_ask(manager, session_id, query):
+    t1 = time.perf_counter()
+    await manager.ask(session_id, query)
+    return time.perf_counter() - t1
+
+
+async def drain(session, replies):
+    for _ in range(replies):
+        await session.output_queue.get()
+        session.output_queue.task_done()
+
+
+async def run(manager, sessions, backlog):
+    await manager.start()
+    t1 = time.perf_counter()
+    busy = manager.session("busy")
+    for i in range(backlog):
+        manager.submit("busy", f"question {i}")
+    busy = asyncio.create_task(drain(busy, backlog))
+    light = await asyncio.gather(
+        *[timed_ask(manager, f"user-{i}", "hello") for i in range(sessions)]
+    )
+    await busy
+    wall = time.perf_counter() - t1
+    await manager.stop()
+    return light, wall
+
+
+@click.command()
+@click.option("--sessions", default=50, show_default=True)
+@click.option(
+    "--backlog", default=50, show_default=True, help="Turns queued by one session"
+)
+@click.option("--max-active-turns", default=8, show_default=True)
+@click.option(
+    "--latency", default=0.1, show_default=True, help="Stub completion latency [s]"
+)
+def main(sessions, backlog, max_active_turns, latency):
+    with StubServer(latency=latency) as stub:
+        client = AIClient(
+            "stub-key",
+            "stub-model",
+            Queue(),
+            Queue(),
+            limiter=RateLimiter(0, 0),
+            server_url=stub.url,
+        )
+        manager = SessionManager(client, max_active_turns=max_active_turns)
+        light, wall = asyncio.run(run(manager, sessions, backlog))
+    light.sort()
+    turns = sessions + backlog
+    click.echo(f"sessions:         {sessions} + 1 with {backlog} queued turns")
+    click.echo(f"active turns:     {max_active_turns}")
+    click.echo(f"light p50:        {statistics.median(light) * 1000:0.1f} ms")
+    click.echo(f"light p99:        {light[int(len(light) * 0.99) - 1] * 1000:0.1f} ms")
+    click.echo(f"wall:             {wall:0.3f} s")
+    click.echo(f"turns/s:          {turns / wall:0.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Start-up cost of the CLI entry points, with a regression threshold.
+
+For every entry point this reports the wall time of `--help` and, from
+`python -X importtime`, the cumulative import time of the entry module and
+its slowest dependencies. Exits non-zero when an import time exceeds
+`--max-import-ms`, so it can run as a check in CI.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+ENTRY_POINTS = {
+    "mistral_cli_tool": ("mistral_cli_tool.main", ["-m", "mistral_cli_tool.main"]),
+    "hey_ai": ("hey_ai", [os.path.join(ROOT, "hey_ai.py")]),
+}
+
+
+def import_times(module):
+    """Cumulative import time of `module` and of everything it pulled in.
+
+    Interpreter start-up imports (site, encodings, ...) are left out.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=ROOT,
+        check=True,
+    )
+    deps = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        top_level = not name[1:].startswith(" ")
+        name = name.strip()
+        if top_level and name != module:
+            deps = []
+            continue
+        if top_level:
+            return int(cumulative), deps
+        deps.append((name, int(cumulative)))
+    raise click.ClickException(f"{module} not found in -X importtime output")
+
+
+def help_wall_time(args, runs):
+    samples = []
+    for _ in range(runs):
+        t1 = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args, "--help"],
+            stdout=subprocess.DEVNULL,
+            check=True,
+            cwd=ROOT,
+        )
+        samples.append(time.perf_counter() - t1)
+    return statistics.median(samples)
+
+
+@click.command()
+@click.option("--runs", default=5, show_default=True)
+@click.option("--max-import-ms", default=150.0, show_default=True)
+@click.option("--top", default=5, show_default=True, help="Slowest imports shown")
+def main(runs, max_import_ms, top):
+    failed = False
+    for name, (module, args) in ENTRY_POINTS.items():
+        total, deps = import_times(module)
+        total /= 1000
+        wall = help_wall_time(args, runs)
+        status = "ok" if total <= max_import_ms else "REGRESSION"
+        failed |= total > max_import_ms
+        click.echo(
+            f"{name:17s} --help {wall * 1000:7.1f} ms"
+            f"  import {total:7.1f} ms (max {max_import_ms:0.0f})  {status}"
+        )
+        slowest = sorted(deps, key=lambda t: t[1], reverse=True)
+        for dep, us in slowest[:top]:
+            click.echo(f"    {us / 1000:7.1f} ms  {dep}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Wall time of `hey_ai.py --summarize`, and what a rerun asks again.
+
+A log-like file is summarized against a stub endpoint whose replies are a
+digest of the prompt, once per `--concurrency`, without a cache: 1 is the
+sequential baseline. Then, with a fresh completion cache, the file is
+summarized, one line in its middle is changed, and it is summarized again;
+the second run should only send the chunks around the edit and the
+combines above them.
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import click
+
+from bench_chunking import write_log
+from stub_server import StubHandler, StubServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(HERE)))
+
+import hey_ai  # noqa: E402
+from mistral_cli_tool.cache import CompletionCache  # noqa: E402
+from mistral_cli_tool.rate_limit import RateLimiter  # noqa: E402
+
+
+class DigestHandler(StubHandler):
+    def answer(self, request):
+        prompt = request["messages"][-1]["content"]
+        return f"summary {hashlib.sha256(prompt.encode()).hexdigest()[:16]}", None
+
+
+def edit_middle(path):
+    with open(path, "r+b") as f:
+        f.seek(os.path.getsize(path) // 2)
+        f.readline()
+        f.write(b"2026-10-18 09:30:30 ERROR worker-3 disk full\n")
+
+
+def summarize(path, chunk_tokens, concurrency, cache=None):
+    t1 = time.perf_counter()
+    hey_ai.run_summarize(
+        "stub-model",
+        "",
+        path,
+        chunk_tokens,
+        concurrency,
+        RateLimiter(0, 0),
+        cache,
+    )
+    return time.perf_counter() - t1
+
+
+@click.command()
+@click.option("--size-mb", default=2.0, show_default=True)
+@click.option("--chunk-tokens", default=8000, show_default=True)
+@click.option("--concurrency", default="1,4,16", show_default=True)
+@click.option("--latency", default=0.5, show_default=True)
+def main(size_mb, chunk_tokens, concurrency, latency):
+    from mistralai import Mistral
+
+    with StubServer(
+        latency=latency, handler=DigestHandler
+    ) as stub, tempfile.TemporaryDirectory() as tmp:
+        client = Mistral(api_key="stub-key", server_url=stub.url)
+        hey_ai.get_client = lambda: client
+        path = os.path.join(tmp, "input.log")
+        write_log(path, int(size_mb * 1024 * 1024))
+        walls = {}
+        for workers in [int(c) for c in concurrency.split(",")]:
+            requests = stub.requests
+            walls[workers] = summarize(path, chunk_tokens, workers)
+            click.echo(
+                f"concurrency {workers:3d}: {walls[workers]:7.2f}s,"
+                f" {stub.requests - requests} requests"
+                + (f", {walls[1] / walls[workers]:.1f}x" if 1 in walls else "")
+            )
+        workers = max(walls)
+        cache = CompletionCache(os.path.join(tmp, "cache"))
+        requests = stub.requests
+        summarize(path, chunk_tokens, workers, cache)
+        cold = stub.requests - requests
+        edit_middle(path)
+        requests = stub.requests
+        wall = summarize(path, chunk_tokens, workers, cache)
+        click.echo(
+            f"rerun after editing one line: {stub.requests - requests} of"
+            f" {cold} requests sent again, {wall:.2f}s"
+        )
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Latency of one turn with several tool calls, sequential vs parallel.
+
+The stub completion server asks for `--calls` calls of a tool that sleeps
+for `--tool-latency` seconds. With `--max-parallel-tools 1` the round takes
+the sum of the calls, with enough parallelism it takes the slowest one.
+"""
+
+import asyncio
+import time
+from asyncio import Queue
+
+import click
+from fastmcp import FastMCP
+
+from mistral_cli_tool.ai_client import AIClient
+from mistral_cli_tool.rate_limit import RateLimiter
+
+from stub_server import StubServer, tool_call
+
+bench_server = FastMCP(name="BenchServer")
+
+
+@bench_server.tool()
+async def slow(seconds: float, index: int = 0) -> str:
+    await asyncio.sleep(seconds)
+    return f"call {index} slept {seconds}"
+
+
+async def one_turn(client):
+    await client.start_loop()
+    t1 = time.perf_counter()
+    await client.single_pass("run the tools")
+    elapsed = time.perf_counter() - t1
+    await client.mcp_pool.stop()
+    return elapsed
+
+
+@click.command()
+@click.option("--calls", default=5, show_default=True)
+@click.option("--tool-latency", default=0.2, show_default=True)
+@click.option("--max-parallel-tools", default=4, show_default=True)
+def main(calls, tool_latency, max_parallel_tools):
+    # distinct arguments, or the calls would be memoized into one
+    tool_calls = [
+        tool_call(f"call{i}", "slow", {"seconds": tool_latency, "index": i})
+        for i in range(calls)
+    ]
+    with StubServer(latency=0.0, tool_calls=tool_calls) as stub:
+        for limit in sorted({1, max_parallel_tools}):
+            client = AIClient(
+                "stub-key",
+                "stub-model",
+                Queue(),
+                Queue(),
+                mcp_server=bench_server,
+                limiter=RateLimiter(0, 0),
+                server_url=stub.url,
+                max_parallel_tools=limit,
+            )
+            elapsed = asyncio.run(one_turn(client))
+            click.echo(
+                f"max_parallel_tools {limit:3d}: {elapsed * 1000:8.1f} ms"
+                f" for {calls} x {tool_latency * 1000:0.0f} ms tool calls"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Round trips, tool calls and payload of a multi-step tool-calling turn.
+
+Replays transcripts/train_home.json: the model asks for the same weather
+twice in one step, fetches a ~27 KB page, then asks for the weather again.
+For each `--max-tool-output` cap, reports per turn the completions sent,
+tool calls requested and actually run, and the bytes sent to the API.
+"""
+
+import asyncio
+import os
+from asyncio import Queue
+
+import click
+
+from mistral_cli_tool.ai_client import AIClient
+from mistral_cli_tool.rate_limit import RateLimiter
+
+from replay import Transcript, replay_mcp_server, replay_stub
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TRANSCRIPT = os.path.join(HERE, "transcripts", "train_home.json")
+
+
+async def run(client, queries):
+    await client.mcp_pool.start()
+    turns = []
+    for query in queries:
+        sent = len(client.history.payload_bytes)
+        start = len(client.messages)
+        await client.single_pass(query)
+        await client.output_queue.get()
+        payloads = client.history.payload_bytes[sent:]
+        requested = sum(
+            len(m.tool_calls or [])
+            for m in client.messages[start:]
+            if m.role == "assistant"
+        )
+        turns.append((len(payloads), requested, sum(payloads)))
+    await client.mcp_pool.stop()
+    return turns
+
+
+@click.command()
+@click.option("--max-tool-output", default="0,16000,4000", show_default=True)
+@click.option("--max-tool-steps", default=8, show_default=True)
+def main(max_tool_output, max_tool_steps):
+    transcript = Transcript(TRANSCRIPT)
+    with replay_stub(transcript, 0.0) as stub:
+        for cap in [int(c) for c in max_tool_output.split(",")]:
+            mcp_server = replay_mcp_server(transcript)
+            client = AIClient(
+                "replay-key",
+                transcript.model,
+                Queue(),
+                Queue(),
+                mcp_server=mcp_server,
+                limiter=RateLimiter(0, 0),
+                server_url=stub.url,
+                max_tool_steps=max_tool_steps,
+                max_tool_output=cap,
+            )
+            calls = mcp_server.calls
+            turns = asyncio.run(run(client, transcript.queries))
+            run_calls = mcp_server.calls - calls
+            round_trips, requested, sent = turns[0]
+            click.echo(
+                f"max tool output {cap or 'none':>6}: {round_trips} round trips,"
+                f" {requested} tool calls requested, {run_calls} run,"
+                f" {sent / 1024:7.1f} KB sent in the turn,"
+                f" {turns[-1][2] / 1024:6.1f} KB for the next one"
+            )
+
+
+if __name__ == "__main__":
+    main()
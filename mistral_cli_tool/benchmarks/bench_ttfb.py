@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Time to first byte with and without streaming.
+
+"one-shot" is the first turn of a fresh client including the MCP pool
+start-up, "interactive" the median over the following turns.
+"""
+
+import asyncio
+import statistics
+import time
+from asyncio import Queue
+
+import click
+
+from mistral_cli_tool.ai_client import AIClient, TURN_END
+from mistral_cli_tool.rate_limit import RateLimiter
+
+from stub_server import StubServer
+
+REPLY = " ".join(f"word{i}" for i in range(50))
+
+
+async def turn(client, message):
+    t1 = time.perf_counter()
+    await client.input_queue.put(message)
+    reply = await client.output_queue.get()
+    client.output_queue.task_done()
+    ttfb = time.perf_counter() - t1
+    while client.stream and reply is not TURN_END:
+        reply = await client.output_queue.get()
+        client.output_queue.task_done()
+    return ttfb, time.perf_counter() - t1
+
+
+async def session(client, turns):
+    t1 = time.perf_counter()
+    await client.start_loop()
+    startup = time.perf_counter() - t1
+    first_ttfb, _ = await turn(client, "hello")
+    one_shot = startup + first_ttfb
+    rest = [await turn(client, "hello again") for _ in range(turns - 1)]
+    await client.input_queue.put(None)
+    await client.output_queue.get()
+    client.output_queue.task_done()
+    await client.end_loop()
+    return one_shot, rest
+
+
+@click.command()
+@click.option("--turns", default=10, show_default=True)
+@click.option(
+    "--latency", default=1.0, show_default=True, help="Stub generation time [s]"
+)
+def main(turns, latency):
+    with StubServer(latency=latency, reply=REPLY) as stub:
+        for stream in (False, True):
+            client = AIClient(
+                "stub-key",
+                "stub-model",
+                Queue(),
+                Queue(),
+                limiter=RateLimiter(0, 0),
+                server_url=stub.url,
+                stream=stream,
+            )
+            one_shot, rest = asyncio.run(session(client, turns))
+            interactive = statistics.median(ttfb for ttfb, _ in rest)
+            click.echo(
+                f"{'stream' if stream else 'no-stream':9s}"
+                f"  one-shot ttfb {one_shot * 1000:7.1f} ms"
+                f"  interactive ttfb p50 {interactive * 1000:7.1f} ms"
+                f"  full reply {statistics.median(t for _, t in rest) * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Turn latency and concurrent sessions served by one process.
+
+Runs N independent AIClient sessions against the local stub completion server
+and reports per-turn latency and overall session throughput. `--blocking`
+swaps in the old synchronous `chat.complete` call for comparison.
+"""
+
+import asyncio
+import statistics
+import time
+from asyncio import Queue
+
+import click
+
+from mistral_cli_tool.ai_client import AIClient
+from mistral_cli_tool.rate_limit import RateLimiter
+
+from stub_server import StubServer
+
+
+class BlockingAIClient(AIClient):
+    """AIClient with the pre-async completion call, for comparison."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        chat = self.client.chat
+
+        async def complete_async(**kwargs):
+            return chat.complete(**kwargs)
+
+        chat.complete_async = complete_async
+
+
+async def one_turn(client):
+    await client.start_loop()
+    t1 = time.perf_counter()
+    await client.input_queue.put("What's the weather in Olomouc")
+    await client.output_queue.get()
+    client.output_queue.task_done()
+    elapsed = time.perf_counter() - t1
+    await client.input_queue.put(None)
+    await client.output_queue.get()
+    client.output_queue.task_done()
+    await client.end_loop()
+    return elapsed
+
+
+async def run_sessions(clients):
+    t1 = time.perf_counter()
+    latencies = await asyncio.gather(*[one_turn(c) for c in clients])
+    return latencies, time.perf_counter() - t1
+
+
+@click.command()
+@click.option("--sessions", default=50, show_default=True, help="Concurrent sessions")
+@click.option(
+    "--latency", default=0.2, show_default=True, help="Stub completion latency [s]"
+)
+@click.option("--blocking", is_flag=True, help="Use the synchronous completion call")
+def main(sessions, latency, blocking):
+    cls = BlockingAIClient if blocking else AIClient
+    limiter = RateLimiter(0, 0)
+    with StubServer(latency=latency) as stub:
+        clients = [
+            cls(
+                "stub-key",
+                "stub-model",
+                Queue(),
+                Queue(),
+                limiter=limiter,
+                server_url=stub.url,
+            )
+            for _ in range(sessions)
+        ]
+        latencies, wall = asyncio.run(run_sessions(clients))
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    click.echo(f"mode:             {'blocking' if blocking else 'async'}")
+    click.echo(f"sessions:         {sessions}")
+    click.echo(f"stub latency:     {latency * 1000:0.1f} ms")
+    click.echo(f"turn p50:         {statistics.median(latencies) * 1000:0.1f} ms")
+    click.echo(f"turn p95:         {p95 * 1000:0.1f} ms")
+    click.echo(f"wall:             {wall:0.3f} s")
+    click.echo(f"sessions/s:       {sessions / wall:0.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Export a stored conversation as a replay transcript.
+
+Run a real session with mistral_cli_tool, find it with `--list-sessions`,
+then write its full message log (tool calls and outputs included) to a
+file under transcripts/ for bench_replay.py.
+"""
+
+import json
+
+import click
+
+from mistral_cli_tool.conversations import DEFAULT_HISTORY_DIR, ConversationStore
+
+
+@click.command()
+@click.argument("session_id")
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.option(
+    "--history-dir",
+    type=click.Path(file_okay=False),
+    default=DEFAULT_HISTORY_DIR,
+    envvar="MISTRAL_HISTORY_DIR",
+)
+def main(session_id, output, history_dir):
+    store = ConversationStore(history_dir)
+    session = store.db.execute(
+        "SELECT model FROM sessions WHERE id = ?", (session_id,)
+    ).fetchone()
+    if session is None:
+        raise click.ClickException(f"no stored conversation {session_id}")
+    rows = store.db.execute(
+        "SELECT body FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+    ).fetchall()
+    messages = [json.loads(body) for body, in rows]
+    with open(output, "w") as f:
+        json.dump({"model": session[0], "messages": messages}, f, indent=1)
+    click.echo(f"{len(messages)} messages written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Replay a recorded conversation against AIClient, fully offline.
+
+A transcript is a JSON file `{"model": ..., "messages": [...]}` holding the
+messages of one conversation in the SDK's JSON form (record_transcript.py
+exports one from the conversation store). It is split into turns at user
+messages.
+
+`ReplayHandler` answers a completion request with the recorded assistant
+message: the turn is found by the text of the last user message, the step
+within the turn by the number of assistant messages sent after it (the
+recorded answer when the request says `tool_choice: none`). That
+keeps it stateless, so any number of sessions can replay at once and
+history compaction does not confuse it.
+
+`replay_mcp_server()` is a FastMCP server with the tools of mcp_server.py
+that return the recorded tool outputs after `latency` seconds.
+"""
+
+import asyncio
+import json
+
+from fastmcp import FastMCP
+
+from stub_server import StubHandler, StubServer
+
+
+def arguments_key(name, arguments):
+    if isinstance(arguments, str):
+        arguments = json.loads(arguments or "{}")
+    return name, json.dumps(arguments, sort_keys=True)
+
+
+class Transcript:
+    def __init__(self, path):
+        with open(path) as f:
+            data = json.load(f)
+        self.model = data.get("model", "replay-model")
+        self.messages = data["messages"]
+        self.turns = []
+        for message in self.messages:
+            if message["role"] == "user":
+                self.turns.append({"query": message["content"], "steps": []})
+            elif message["role"] == "assistant" and self.turns:
+                self.turns[-1]["steps"].append(message)
+        self.by_query = {}
+        for turn in self.turns:
+            self.by_query.setdefault(turn["query"], turn)
+        calls = {}
+        for message in self.messages:
+            for tool_call in message.get("tool_calls") or []:
+                calls[tool_call["id"]] = tool_call["function"]
+        self.tool_outputs = {}
+        for message in self.messages:
+            if message["role"] == "tool":
+                function = calls.get(message["tool_call_id"])
+                if function is not None:
+                    key = arguments_key(function["name"], function["arguments"])
+                    self.tool_outputs[key] = message["content"]
+
+    @property
+    def queries(self):
+        return [turn["query"] for turn in self.turns]
+
+    def step(self, query, step):
+        steps = self.by_query[query]["steps"]
+        if step < 0:
+            return steps[-1]
+        return steps[min(step, len(steps) - 1)]
+
+    def tool_output(self, name, arguments):
+        return self.tool_outputs.get(
+            arguments_key(name, arguments), f"no recorded output for {name}"
+        )
+
+
+class ReplayHandler(StubHandler):
+    def answer(self, request):
+        messages = request["messages"]
+        last_user = max(i for i, m in enumerate(messages) if m.get("role") == "user")
+        step = sum(1 for m in messages[last_user:] if m.get("role") == "assistant")
+        if request.get("tool_choice") == "none":
+            step = -1
+        reply = self.server.transcript.step(messages[last_user]["content"], step)
+        return reply.get("content"), reply.get("tool_calls")
+
+
+def replay_stub(transcript, latency):
+    stub = StubServer(latency=latency, handler=ReplayHandler)
+    stub.httpd.transcript = transcript
+    return stub
+
+
+def replay_mcp_server(transcript, latency=0.0):
+    server = FastMCP(name="ReplayServer")
+    server.calls = 0
+
+    async def replay(name, arguments):
+        server.calls += 1
+        if latency:
+            await asyncio.sleep(latency)
+        return transcript.tool_output(name, arguments)
+
+    @server.tool()
+    async def simple_get(url: str) -> str:
+        """Get URL"""
+        return await replay("simple_get", {"url": url})
+
+    @server.tool()
+    async def weather(location: str) -> str:
+        """Get current weather for location"""
+        return await replay("weather", {"location": location})
+
+    @server.tool(name="time")
+    async def current_time() -> str:
+        """Current date and time"""
+        return await replay("time", {})
+
+    return server
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Mistral chat completions endpoint.
+
+Every POST to /v1/chat/completions sleeps for `latency` seconds and answers
+with a fixed assistant message, so benchmarks can run without network access
+or an API key. Point the client at it with `server_url=stub.url`.
+
+When `tool_calls` is given, a request whose last message comes from the user
+is answered with those tool calls instead.
+
+Streamed requests get the reply word by word as server-sent events, with
+`latency` spread evenly over the words.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def tool_call(call_id, name, arguments):
+    return {
+        "id": call_id,
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)},
+    }
+
+
+def completion_body(model, content="stub reply", tool_calls=None):
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "model": model,
+        "created": int(time.time()),
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        "choices": [
+            {
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": content,
+                    "tool_calls": tool_calls,
+                },
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+            }
+        ],
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # send headers and body in one segment, otherwise Nagle and delayed ACKs
+    # add ~40 ms to every request on a kept-alive connection
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests += 1
+        model = request.get("model", "stub")
+        content, tool_calls = self.answer(request)
+        if request.get("stream"):
+            self.stream_reply(model, content, tool_calls)
+            return
+        time.sleep(self.server.latency)
+        body = json.dumps(
+            completion_body(model, content=content, tool_calls=tool_calls)
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def answer(self, request):
+        """(content, tool_calls) of the reply to a completion request."""
+        messages = request.get("messages") or [{}]
+        if self.server.tool_calls and messages[-1].get("role") == "user":
+            return self.server.reply, self.server.tool_calls
+        return self.server.reply, None
+
+    def stream_reply(self, model, content, tool_calls):
+        words = (content or "").split(" ")
+        words = [w + " " for w in words[:-1]] + words[-1:]
+        deltas = [{"role": "assistant", "content": w} for w in words]
+        if tool_calls:
+            deltas = [
+                {"role": "assistant", "content": "", "tool_calls": [dict(c, index=i)]}
+                for i, c in enumerate(tool_calls)
+            ]
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, delta in enumerate(deltas):
+            time.sleep(self.server.latency / len(deltas))
+            last = i == len(deltas) - 1
+            chunk = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "created": int(time.time()),
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": delta,
+                        "finish_reason": (
+                            ("tool_calls" if tool_calls else "stop") if last else None
+                        ),
+                    }
+                ],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # the default backlog of 5 drops SYNs under a burst of concurrent sessions
+    request_queue_size = 1024
+
+
+class StubServer:
+    def __init__(
+        self, latency=0.05, tool_calls=None, reply="stub reply", handler=StubHandler
+    ):
+        self.httpd = StubHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.requests = 0
+        self.httpd.tool_calls = tool_calls
+        self.httpd.reply = reply
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1 +1,14 @@
 LOGGER_NAME = "Mistral CLI Tool"
+
+# defaults shared by the CLI options and the client, kept here so that the
+# CLI can show them without importing the SDK
+DEFAULT_REQUESTS_PER_MINUTE = 60  # free tier: 1 request/s
+DEFAULT_TOKENS_PER_MINUTE = 500_000
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_MAX_PARALLEL_TOOLS = 4
+DEFAULT_TOOL_TIMEOUT = 30.0
+DEFAULT_MAX_TOOL_STEPS = 8
+DEFAULT_TURN_TIMEOUT = 300.0
+# characters of one tool result that go into the history
+DEFAULT_MAX_TOOL_OUTPUT = 16000
+DEFAULT_CHUNK_TOKENS = 8000
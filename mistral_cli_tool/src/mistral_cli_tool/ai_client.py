@@ -11,14 +11,36 @@ import math
 from mistralai import Mistral
 from mistralai.models.assistantmessage import AssistantMessage
 from mistralai.models.function import Function
+from mistralai.models.functioncall import FunctionCall
+from mistralai.models.toolcall import ToolCall
 from mistralai.models.toolmessage import ToolMessage
 from mistralai.models.usermessage import UserMessage
 
 from fastmcp import Client
+from fastmcp.exceptions import ClientError
 from mistral_cli_tool.mcp_server import mcp_server
 
 # mcp_server = "http://localhost:8000/sse"
-from mistral_cli_tool import LOGGER_NAME
+from mistral_cli_tool import (
+    LOGGER_NAME,
+    DEFAULT_MAX_PARALLEL_TOOLS,
+    DEFAULT_TOOL_TIMEOUT,
+    DEFAULT_MAX_TOOL_STEPS,
+    DEFAULT_TURN_TIMEOUT,
+    DEFAULT_MAX_TOOL_OUTPUT,
+)
+from mistral_cli_tool.rate_limit import RateLimiter, payload_tokens
+from mistral_cli_tool.tracing import span
+from mistral_cli_tool.catalogue import server_identity
+from mistral_cli_tool.mcp_pool import MCPSessionPool
+from mistral_cli_tool.cache import cache_key
+from mistral_cli_tool.conversations import new_session_id
+from mistral_cli_tool.history import (
+    HistoryBudget,
+    truncate_text,
+    DEFAULT_MAX_HISTORY_TOKENS,
+    DEFAULT_MAX_TOOL_CHARS,
+)
 from mcp.types import Tool
 
 import asyncio
@@ -26,6 +48,9 @@ from asyncio import Queue
 
 log = logging.getLogger(LOGGER_NAME)
 
+# put on the output queue after the last chunk of a streamed reply
+TURN_END = object()
+
 
 class AIClient:
     def __init__(
@@ -35,32 +60,71 @@ class AIClient:
         input_queue: Queue,
         output_queue: Queue,
         mcp_server=mcp_server,
+        limiter=None,
+        server_url=None,
+        mcp_pool_size=1,
+        max_parallel_tools=DEFAULT_MAX_PARALLEL_TOOLS,
+        tool_timeout=DEFAULT_TOOL_TIMEOUT,
+        max_tool_steps=DEFAULT_MAX_TOOL_STEPS,
+        turn_timeout=DEFAULT_TURN_TIMEOUT,
+        max_tool_output=DEFAULT_MAX_TOOL_OUTPUT,
+        stream=False,
+        max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+        max_tool_chars=DEFAULT_MAX_TOOL_CHARS,
+        cache=None,
+        catalogue=None,
+        store=None,
+        session_id=None,
     ):
-        self.client = Mistral(api_key=api_key)
+        self.client = Mistral(api_key=api_key, server_url=server_url)
         self.model = model
+        self.limiter = limiter if limiter is not None else RateLimiter()
         self.mcp_server = mcp_server
+        self.mcp_pool = MCPSessionPool(mcp_server, size=mcp_pool_size)
+        self.tool_limiter = asyncio.Semaphore(max(1, max_parallel_tools))
+        self.tool_timeout = tool_timeout
+        self.max_tool_steps = max(1, max_tool_steps)
+        self.turn_timeout = turn_timeout
+        self.max_tool_output = max_tool_output
+        self.stream = stream
         self.input_queue = input_queue
         self.output_queue = output_queue
         self.messages = list()
+        self.history = HistoryBudget(max_history_tokens, max_tool_chars)
+        self.cache = cache
+        self.catalogue = catalogue
+        self.store = store
+        self.id = session_id or new_session_id()
         asyncio.run(self.get_mcp_definitions())
 
     async def get_mcp_definitions(self):
-        async with Client(self.mcp_server) as client:
-            # List available resources
-            self.resources = await client.list_resources()
-            log.info(self.resources)
+        with span("mcp.definitions", server=server_identity(self.mcp_server)):
+            if self.catalogue is not None:
+                entry = await self.catalogue.load(self.mcp_server)
+                if entry is not None:
+                    self.resources, self.mcp_tools, self.tools = entry
+                    return
+            async with Client(self.mcp_server) as client:
+                # List available resources
+                self.resources = await client.list_resources()
+                log.info(self.resources)
 
-            # List available tools
-            self.mcp_tools = await client.list_tools()
-            log.info(type(self.mcp_tools[0]))
-            self.tools = [tool_mcp_to_mistral(tool) for tool in self.mcp_tools]
-            log.info(self.tools)
+                # List available tools
+                self.mcp_tools = await client.list_tools()
+                log.info(type(self.mcp_tools[0]))
+                self.tools = [tool_mcp_to_mistral(tool) for tool in self.mcp_tools]
+                log.info(self.tools)
+            if self.catalogue is not None:
+                await self.catalogue.save(
+                    self.mcp_server, self.resources, self.mcp_tools, self.tools
+                )
 
     def add_mcp(self, mcp_server):
         self.mcp_server = mcp_server
-        pass
+        self.mcp_pool = MCPSessionPool(mcp_server, size=self.mcp_pool.size)
 
     async def start_loop(self):
+        await self.mcp_pool.start()
         self.worker_task = asyncio.create_task(self.worker())
 
     async def end_loop(self):
@@ -71,6 +135,7 @@ class AIClient:
             await self.worker_task
         except asyncio.CancelledError:
             pass
+        await self.mcp_pool.stop()
 
     async def worker(self):
         log.info("worker start")
@@ -80,60 +145,289 @@ class AIClient:
                 self.input_queue.task_done()
                 await self.output_queue.put(None)
                 break
-            result = await self.single_pass(user_query)
+            try:
+                await self.single_pass(user_query)
+            except Exception as e:
+                # a reply is still due, run_it and print_reply wait for it
+                log.exception("turn failed")
+                await self.output_queue.put(f"Error: {e}")
+                if self.stream:
+                    await self.output_queue.put(TURN_END)
             self.input_queue.task_done()
         log.info("worker end")
 
-    async def single_pass(self, user_query):
-        self.messages.append(UserMessage(content=user_query, tools=self.tools))
-        time.sleep(1)
-        chat_response = self.client.chat.complete(
-            model=self.model,
-            messages=self.messages,
-            tools=self.tools,
-            parallel_tool_calls=False,
-        )
-        log.info(chat_response)
-        tool_calls = chat_response.choices[0].message.tool_calls
-        if tool_calls is not None:
-            self.messages.append(
-                AssistantMessage(
-                    content=chat_response.choices[0].message.content,
-                    tool_calls=chat_response.choices[0].message.tool_calls,
+    async def single_pass(self, user_query, session=None):
+        """Answer one user query.
+
+        The model may call tools for up to `max_tool_steps` rounds; after
+        that, or once every call of a round repeats an earlier one, it is
+        asked to answer without tools. The whole turn must finish within
+        `turn_timeout` seconds, otherwise it ends with an error reply.
+
+        `session` is anything with `id`, `messages`, `history` and
+        `output_queue` (see sessions.Session); by default the client's own
+        conversation is used. With a `store`, the turn is appended to the
+        conversation log once it is complete.
+        """
+        with span("turn") as s:
+            session = session or self
+            user_message = UserMessage(content=user_query, tools=self.tools)
+            session.messages.append(user_message)
+            sent = len(session.history.payload_bytes)
+            memo = dict()
+            steps = 0
+            final = False
+            deadline = time.monotonic() + self.turn_timeout
+            try:
+                message = await self.complete_until(
+                    deadline, session, parallel_tool_calls=True
                 )
-            )
-            async with Client(self.mcp_server) as mcp_client:
-                for tool_call in chat_response.choices[0].message.tool_calls:
-                    log.info(tool_call)
-                    function_name = tool_call.function.name
-                    function_params = json.loads(tool_call.function.arguments)
-                    function_response = await mcp_client.call_tool(
-                        function_name, arguments=function_params
-                    )
-                    log.info(function_response)
-                    self.messages.append(
-                        ToolMessage(
-                            name=function_name,
-                            content=function_response[0].text,
-                            tool_call_id=tool_call.id,
+                while message.tool_calls and not final:
+                    session.messages.append(
+                        AssistantMessage(
+                            content=message.content,
+                            tool_calls=message.tool_calls,
                         )
                     )
-            time.sleep(1)
-            chat_response = self.client.chat.complete(
+                    steps += 1
+                    repeated = all(
+                        tool_call_key(tool_call) in memo
+                        for tool_call in message.tool_calls
+                    )
+                    session.messages.extend(
+                        await self.run_tool_calls(message.tool_calls, memo, deadline)
+                    )
+                    final = steps >= self.max_tool_steps or repeated
+                    if repeated:
+                        log.info(f"tool calls repeated at step {steps}, answering")
+                    elif final:
+                        log.warning(f"no more tools after {steps} steps")
+                    if final:
+                        kwargs = dict(tool_choice="none")
+                    else:
+                        kwargs = dict(parallel_tool_calls=True)
+                    message = await self.complete_until(deadline, session, **kwargs)
+                content = message.content
+            except asyncio.TimeoutError:
+                log.warning(f"turn timed out after {self.turn_timeout}s")
+                content = f"Error: no answer within {self.turn_timeout}s"
+                s.set(error="timeout")
+                if self.stream:
+                    await session.output_queue.put(content)
+            session.messages.append(AssistantMessage(content=content))
+            payloads = session.history.payload_bytes[sent:]
+            s.set(steps=steps, round_trips=len(payloads), payload_bytes=sum(payloads))
+            log.info(
+                f"turn: {steps} tool steps, {len(payloads)} round trips,"
+                f" {sum(payloads)} bytes sent"
+            )
+            if self.store is not None:
+                self.persist(session, user_message)
+            if self.stream:
+                await session.output_queue.put(TURN_END)
+            else:
+                await session.output_queue.put(content)
+
+    async def complete_until(self, deadline, session, **kwargs):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(self.complete(session, **kwargs), remaining)
+
+    def persist(self, session, user_message):
+        """Append the messages of the turn started by `user_message`."""
+        with span("history.persist"):
+            start = next(
+                i
+                for i in range(len(session.messages) - 1, -1, -1)
+                if session.messages[i] is user_message
+            )
+            self.store.append(
+                session.id, session.messages[start:], session.messages, self.model
+            )
+
+    async def complete(self, session=None, **kwargs):
+        session = session or self
+        with span("chat.complete", model=self.model, stream=self.stream) as s:
+            session.history.compact(session.messages)
+            payload = session.history.record_payload(session.messages, self.tools)
+            s.set(messages=len(session.messages), payload_bytes=payload)
+            key = None
+            if self.cache is not None:
+                key = cache_key(self.model, session.messages, self.tools, **kwargs)
+                cached = self.cache.get(key)
+                s.set(cached=cached is not None)
+                if cached is not None:
+                    message = AssistantMessage.model_validate_json(cached)
+                    if self.stream and message.content:
+                        await session.output_queue.put(content_text(message.content))
+                    return message
+            tokens = payload_tokens(payload)
+            if self.stream:
+                message = await self.complete_stream(session, tokens, **kwargs)
+            else:
+                chat_response = await self.limiter.call_async(
+                    lambda: self.client.chat.complete_async(
+                        model=self.model,
+                        messages=session.messages,
+                        tools=self.tools,
+                        **kwargs,
+                    ),
+                    tokens,
+                )
+                log.info(chat_response)
+                message = chat_response.choices[0].message
+            if key is not None:
+                self.cache.put(key, message.model_dump_json())
+            return message
+
+    async def complete_stream(self, session=None, tokens=0, **kwargs):
+        """Stream a completion, forwarding text chunks to the output queue.
+
+        Tool-call deltas are merged by their index, so the returned
+        AssistantMessage looks the same as a non-streamed one.
+        """
+        session = session or self
+        content = []
+        tool_calls = {}
+        # retries only cover opening the stream, before any chunk is out
+        response = await self.limiter.call_async(
+            lambda: self.client.chat.stream_async(
                 model=self.model,
-                messages=self.messages,
+                messages=session.messages,
                 tools=self.tools,
-            )
-            self.messages.append(
-                AssistantMessage(
-                    content=chat_response.choices[0].message.content,
-                    tool_calls=chat_response.choices[0].message.tool_calls,
+                **kwargs,
+            ),
+            tokens,
+        )
+        async with response as events:
+            async for event in events:
+                if not event.data.choices:
+                    continue
+                delta = event.data.choices[0].delta
+                if delta.content:
+                    chunk = content_text(delta.content)
+                    content.append(chunk)
+                    await session.output_queue.put(chunk)
+                for tool_call in delta.tool_calls or []:
+                    merge_tool_call(tool_calls, tool_call)
+        message = AssistantMessage(
+            content="".join(content),
+            tool_calls=[tool_calls[i] for i in sorted(tool_calls)] or None,
+        )
+        log.info(message)
+        return message
+
+    async def run_tool_calls(self, tool_calls, memo=None, deadline=None):
+        """Run the tool calls of one step concurrently.
+
+        At most `max_parallel_tools` calls are in flight, each bounded by
+        `tool_timeout` and the turn's `deadline`. Calls with the same name
+        and arguments as one already in `memo` (kept for one turn) share its
+        result instead of running again. The returned ToolMessages keep the
+        order of `tool_calls`.
+        """
+        if memo is None:
+            memo = dict()
+
+        async def one(tool_call):
+            key = tool_call_key(tool_call)
+            if key in memo:
+                log.info(f"reusing the result of {key[0]}{key[1]}")
+            else:
+                memo[key] = asyncio.ensure_future(
+                    self.call_tool(
+                        tool_call.function.name, json.loads(key[1]), deadline
+                    )
                 )
+            return ToolMessage(
+                name=tool_call.function.name,
+                content=await memo[key],
+                tool_call_id=tool_call.id,
             )
-        await self.output_queue.put(chat_response.choices[0].message.content)
+
+        return await asyncio.gather(*[one(tool_call) for tool_call in tool_calls])
+
+    async def call_tool(self, function_name, function_params, deadline=None):
+        """Text result of one tool call, cut to `max_tool_output` characters."""
+        log.info(f"{function_name}({function_params})")
+        timeout = self.tool_timeout
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+        async with self.tool_limiter:
+            with span("tool.call", tool=function_name) as s:
+                try:
+                    function_response = await asyncio.wait_for(
+                        self.mcp_pool.call_tool(
+                            function_name, arguments=function_params
+                        ),
+                        timeout,
+                    )
+                    content = function_response[0].text
+                except asyncio.TimeoutError:
+                    log.warning(f"tool {function_name} timed out")
+                    content = f"Error: {function_name} timed out after {timeout:g}s"
+                    s.set(error="timeout")
+                except ClientError as e:
+                    log.warning(f"tool {function_name} failed: {e}")
+                    content = f"Error: {e}"
+                    s.set(error=str(e))
+                s.set(output_chars=len(content))
+        log.info(content)
+        if self.max_tool_output:
+            content = truncate_text(content, self.max_tool_output)
+        return content
+
+
+def tool_call_key(tool_call):
+    arguments = tool_call.function.arguments
+    if isinstance(arguments, str):
+        arguments = json.loads(arguments or "{}")
+    return tool_call.function.name, json.dumps(arguments, sort_keys=True)
+
+
+def content_text(content):
+    if isinstance(content, str):
+        return content
+    return "".join(getattr(chunk, "text", "") for chunk in content)
+
+
+def merge_tool_call(tool_calls, delta):
+    index = delta.index or 0
+    current = tool_calls.get(index)
+    if current is None:
+        tool_calls[index] = ToolCall(
+            id=delta.id,
+            type=delta.type,
+            index=index,
+            function=FunctionCall(
+                name=delta.function.name, arguments=delta.function.arguments
+            ),
+        )
+        return
+    if delta.id and delta.id != "null":
+        current.id = delta.id
+    if delta.function.name and not current.function.name:
+        current.function.name = delta.function.name
+    arguments = delta.function.arguments
+    if isinstance(arguments, str) and isinstance(current.function.arguments, str):
+        current.function.arguments += arguments
+    elif arguments:
+        current.function.arguments = arguments
+
+
+# conversions memoized by tool schema, servers rarely change their tools
+_converted_tools = dict()
 
 
 def tool_mcp_to_mistral(tool: Tool):
+    key = json.dumps(tool.model_dump(mode="json"), sort_keys=True)
+    if key not in _converted_tools:
+        _converted_tools[key] = _tool_mcp_to_mistral(tool)
+    return _converted_tools[key]
+
+
+def _tool_mcp_to_mistral(tool: Tool):
     json_tool = vars(tool)
     mistral_tool = dict()
     # might as well throw an exception if we don't have a name and a description
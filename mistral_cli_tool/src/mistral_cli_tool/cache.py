@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from mistral_cli_tool import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "mistral_cli_tool",
+)
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_FILE = "completions.sqlite3"
+# puts between two sweeps of expired entries
+EVICT_EVERY = 100
+# an over-full cache is evicted down to this share of max_bytes, so that
+# the next puts do not each evict again
+EVICT_TO = 0.9
+
+
+def normalize(value):
+    """Turn SDK models and plain dicts into the same JSON-able structure.
+
+    None values are dropped, so a message with `tool_calls=None` keys the same
+    as one without the field.
+    """
+    if hasattr(value, "model_dump_json"):
+        value = json.loads(value.model_dump_json())
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+def cache_key(model, messages, tools=None, **params):
+    payload = {
+        "model": model,
+        "messages": normalize(messages),
+        "tools": normalize(tools or []),
+        "params": normalize(params),
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class CompletionCache:
+    """On-disk cache of assistant messages keyed by the request payload.
+
+    Entries live in SQLite in WAL mode, so several processes can read and
+    write at the same time; within a process the connection is shared by
+    threads under a lock. Entries older than `ttl` seconds are ignored and
+    removed; once the stored values exceed `max_bytes` the least recently
+    used entries are evicted. The size of the values is kept as a running
+    total and only summed over the table again when evicting, which happens
+    when it is over `max_bytes` or every EVICT_EVERY puts.
+    """
+
+    def __init__(
+        self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, CACHE_FILE)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS completions (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created REAL NOT NULL,
+                        accessed REAL NOT NULL)"""
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)"
+        )
+        self.puts = 0
+        self.total = self.stored_bytes()
+
+    def stored_bytes(self):
+        # other processes write to the same file, so this is only exact
+        # right after it is summed
+        return self.db.execute("SELECT SUM(size) FROM completions").fetchone()[0] or 0
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        now = time.time()
+        row = self.db.execute(
+            "SELECT value, created FROM completions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        value, created = row
+        if self.ttl and created + self.ttl < now:
+            self.db.execute("DELETE FROM completions WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+        self.db.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        log.info(f"completion cache hit {key[:12]}")
+        return value
+
+    def put(self, key, value):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT size FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self.total += len(value) - (row[0] if row else 0)
+            self.puts += 1
+            over = self.max_bytes and self.total > self.max_bytes
+            if over or self.puts % EVICT_EVERY == 0:
+                self.evict()
+
+    def evict(self):
+        if self.ttl:
+            self.db.execute(
+                "DELETE FROM completions WHERE created < ?", (time.time() - self.ttl,)
+            )
+        self.total = self.stored_bytes()
+        if not self.max_bytes or self.total <= self.max_bytes:
+            return
+        excess = self.total - int(self.max_bytes * EVICT_TO)
+        # walks the accessed index from the oldest, only as far as needed
+        rows = self.db.execute("SELECT key, size FROM completions ORDER BY accessed")
+        victims = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+            self.total -= size
+        rows.close()
+        self.db.executemany("DELETE FROM completions WHERE key = ?", victims)
+        log.info(f"completion cache evicted {len(victims)} entries")
+
+    def close(self):
+        self.db.close()
+
+
+def open_cache(no_cache, cache_dir):
+    """Cache for a CLI run, or None when disabled or unusable."""
+    if no_cache:
+        return None
+    try:
+        return CompletionCache(cache_dir or DEFAULT_CACHE_DIR)
+    except (OSError, sqlite3.Error) as e:
+        log.warning(f"completion cache disabled: {e}")
+        return None
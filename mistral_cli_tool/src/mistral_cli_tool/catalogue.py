@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+from fastmcp import FastMCP
+from mcp.types import Resource, Tool
+
+from mistral_cli_tool import LOGGER_NAME
+from mistral_cli_tool.cache import DEFAULT_CACHE_DIR
+
+log = logging.getLogger(LOGGER_NAME)
+
+# remote servers cannot be checked without a handshake, trust them this long
+DEFAULT_CATALOGUE_TTL = 3600
+
+
+def schema_hash(tools):
+    blob = json.dumps(
+        [tool.model_dump(mode="json") for tool in tools],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def server_identity(mcp_server):
+    if isinstance(mcp_server, FastMCP):
+        return f"fastmcp:{mcp_server.name}"
+    return str(mcp_server)
+
+
+async def server_fingerprint(mcp_server):
+    """Cheap stand-in for a server version, or None if there is none.
+
+    In-process servers are fingerprinted by the mtimes of the modules that
+    define their tools, local server scripts by their own mtime. Remote
+    servers have no fingerprint and fall back to the TTL.
+    """
+    if isinstance(mcp_server, FastMCP):
+        tools = await mcp_server.get_tools()
+        files = set()
+        for tool in tools.values():
+            module = sys.modules.get(getattr(tool.fn, "__module__", None))
+            if getattr(module, "__file__", None):
+                files.add(module.__file__)
+        return {
+            "tools": sorted(tools),
+            "files": [[f, os.stat(f).st_mtime_ns] for f in sorted(files)],
+        }
+    if os.path.exists(str(mcp_server)):
+        return [[str(mcp_server), os.stat(str(mcp_server)).st_mtime_ns]]
+    return None
+
+
+class ToolCatalogue:
+    """On-disk copy of a server's resources and tools, in MCP and Mistral form.
+
+    A valid entry lets AIClient start without connecting to the server at
+    all. Entries are keyed by server identity and store the schema hash of
+    the tools they were built from.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_CATALOGUE_TTL):
+        self.dir = os.path.join(cache_dir, "tools")
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, mcp_server):
+        name = hashlib.sha256(server_identity(mcp_server).encode()).hexdigest()
+        return os.path.join(self.dir, f"{name[:32]}.json")
+
+    async def load(self, mcp_server):
+        """(resources, mcp_tools, tools) if the cached entry is still valid."""
+        try:
+            with open(self.path(mcp_server)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        fingerprint = await server_fingerprint(mcp_server)
+        if fingerprint is not None:
+            valid = entry["fingerprint"] == fingerprint
+        else:
+            valid = entry["created"] + self.ttl > time.time()
+        if not valid or entry["identity"] != server_identity(mcp_server):
+            log.info(f"tool catalogue for {server_identity(mcp_server)} is stale")
+            self.misses += 1
+            return None
+        self.hits += 1
+        log.info(f"tool catalogue hit, schema {entry['schema_hash'][:12]}")
+        return (
+            [Resource.model_validate(r) for r in entry["resources"]],
+            [Tool.model_validate(t) for t in entry["mcp_tools"]],
+            entry["tools"],
+        )
+
+    async def save(self, mcp_server, resources, mcp_tools, tools):
+        entry = {
+            "identity": server_identity(mcp_server),
+            "fingerprint": await server_fingerprint(mcp_server),
+            "created": time.time(),
+            "schema_hash": schema_hash(mcp_tools),
+            "resources": [r.model_dump(mode="json") for r in resources],
+            "mcp_tools": [t.model_dump(mode="json") for t in mcp_tools],
+            "tools": tools,
+        }
+        path = self.path(mcp_server)
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            # write and rename, so concurrent starts never read half a file
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning(f"could not save tool catalogue: {e}")
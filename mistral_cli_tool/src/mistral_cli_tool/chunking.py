@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import mmap
+import os
+import zlib
+from contextlib import contextmanager
+
+from mistral_cli_tool import LOGGER_NAME, DEFAULT_CHUNK_TOKENS
+from mistral_cli_tool.history import CHARS_PER_TOKEN
+
+log = logging.getLogger(LOGGER_NAME)
+
+MAP_PROMPT = """{instruction}
+
+(This is one part of a larger input, answer for this part only.)
+
+{text}"""
+
+REDUCE_PROMPT = """{instruction}
+
+The input was too long to answer at once. Below are the answers for its
+consecutive parts, in order. Combine them into one answer for the whole input.
+
+{answers}"""
+
+SEPARATOR = "\n\n---\n\n"
+
+SUMMARY_INSTRUCTION = "Summarize the text. Keep names, numbers, dates and conclusions."
+# average number of answers combined by one request of a tree reduce
+DEFAULT_FAN_IN = 4
+
+
+@contextmanager
+def mapped(path):
+    """The file at `path` as a read-only mmap (b"" when it is empty)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+            yield buf
+        finally:
+            buf.close()
+
+
+def cut(buf, start, end):
+    """End of a chunk at or before `end`: after a newline, else at a character."""
+    newline = buf.rfind(b"\n", start, end)
+    if newline >= start:
+        return newline + 1
+    while end > start + 1 and buf[end] & 0xC0 == 0x80:
+        end -= 1
+    return end
+
+
+def chunk_bounds(buf, max_bytes):
+    """Yield (start, end) offsets of consecutive chunks of at most `max_bytes`.
+
+    Chunks end after a newline; a line longer than a chunk is cut at a UTF-8
+    character boundary. Only the bytes around each cut are read.
+    """
+    size = len(buf)
+    start = 0
+    while start < size:
+        end = min(size, start + max_bytes)
+        if end < size:
+            end = cut(buf, start, end)
+        yield start, end
+        start = end
+
+
+def content_cut(buf, start, end, span):
+    """First line end in [start, end) chosen by the hash of its line.
+
+    A line is picked with a probability of its length over `span`, so cuts
+    are about `span` bytes apart whatever the line lengths.
+    """
+    line_start = start
+    while True:
+        newline = buf.find(b"\n", line_start, end)
+        if newline < 0:
+            return None
+        line = buf[line_start : newline + 1]
+        if zlib.crc32(line) * span < len(line) << 32:
+            return newline + 1
+        line_start = newline + 1
+
+
+def content_bounds(buf, max_bytes):
+    """Like chunk_bounds, but cut where the content says so.
+
+    After the first `max_bytes / 4` bytes of a chunk, it ends after a line
+    picked by content_cut, so chunks average about 3/4 of `max_bytes`. The
+    cuts depend on the lines around them, not on their offsets: an edit
+    changes the chunks it touches and the chain of cuts soon falls back in
+    step, so the other chunks (and their cached answers) stay the same.
+    """
+    size = len(buf)
+    start = 0
+    while start < size:
+        end = min(size, start + max_bytes)
+        if end < size:
+            end = content_cut(
+                buf, start + max_bytes // 4, end, max(1, max_bytes // 2)
+            ) or cut(buf, start, end)
+        yield start, end
+        start = end
+
+
+def chunk_text(buf, start, end):
+    with memoryview(buf) as view, view[start:end] as part:
+        return str(part, "utf-8", "replace")
+
+
+def release(buf, start, end):
+    """Drop the pages of `buf[start:end]` from the resident set.
+
+    The mapping is file-backed, so dropped pages are read again from the
+    page cache if needed; without this, RSS would grow with the file.
+    Callers release the whole prefix read so far: dropping each chunk alone
+    leaves pages mapped by fault-around on its neighbours.
+    """
+    if not isinstance(buf, mmap.mmap) or not hasattr(mmap, "MADV_DONTNEED"):
+        return start
+    start -= start % mmap.PAGESIZE
+    end -= end % mmap.PAGESIZE
+    if end > start:
+        buf.madvise(mmap.MADV_DONTNEED, start, end - start)
+    return max(start, end)
+
+
+def groups(answers, max_bytes):
+    """Consecutive groups of about `max_bytes`, never one answer alone."""
+    result = [[]]
+    size = 0
+    for answer in answers:
+        if len(result[-1]) >= 2 and size + len(answer) > max_bytes:
+            result.append([])
+            size = 0
+        result[-1].append(answer)
+        size += len(answer)
+    if len(result) > 1 and len(result[-1]) == 1:
+        result[-2].extend(result.pop())
+    return result
+
+
+class Reducer:
+    """Combines partial answers as they arrive, in input order.
+
+    Answers are collected per level; once a level holds `max_bytes` of them
+    they are combined into one answer on the next level. Memory stays at
+    about `max_bytes` per level, and levels grow with the log of the input.
+    """
+
+    def __init__(self, instruction, ask, max_bytes):
+        self.instruction = instruction
+        self.ask = ask
+        self.max_bytes = max_bytes
+        self.levels = []
+        self.reduces = 0
+
+    async def combine(self, answers):
+        self.reduces += 1
+        prompt = REDUCE_PROMPT.format(
+            instruction=self.instruction, answers=SEPARATOR.join(answers)
+        )
+        return await self.ask(prompt)
+
+    async def add(self, answer, level=0):
+        if level == len(self.levels):
+            self.levels.append([])
+        answers = self.levels[level]
+        answers.append(answer)
+        if len(answers) >= 2 and sum(map(len, answers)) >= self.max_bytes:
+            self.levels[level] = []
+            await self.add(await self.combine(answers), level + 1)
+
+    async def result(self):
+        # higher levels hold earlier parts of the input
+        answers = [a for level in reversed(self.levels) for a in level]
+        while len(answers) > 1:
+            answers = [
+                await self.combine(group) for group in groups(answers, self.max_bytes)
+            ]
+        return answers[0] if answers else ""
+
+
+def content_groups(answers, max_bytes, fan_in=DEFAULT_FAN_IN):
+    """Consecutive groups of about `fan_in` answers, cut by their hashes.
+
+    As with content_bounds, an answer that did not change ends a group or
+    not the same way as before, so the groups of a tree reduce stay the same
+    away from a changed chunk. A group holds at least two answers and at most
+    `max_bytes` of them (unless two alone are larger) or `2 * fan_in`.
+    """
+    result = [[]]
+    size = 0
+    for answer in answers:
+        group = result[-1]
+        if len(group) >= 2 and (
+            size + len(answer) > max_bytes or len(group) >= 2 * fan_in
+        ):
+            result.append([])
+            group = result[-1]
+            size = 0
+        group.append(answer)
+        size += len(answer)
+        if len(group) >= 2 and zlib.crc32(answer.encode()) % fan_in == 0:
+            result.append([])
+            size = 0
+    if not result[-1]:
+        result.pop()
+    if len(result) > 1 and len(result[-1]) == 1:
+        result[-2].extend(result.pop())
+    return result
+
+
+async def map_chunks(buf, bounds, instruction, ask, concurrency):
+    """Yield the answers for the chunks at `bounds`, in input order.
+
+    At most `concurrency` chunks are decoded and in flight at once.
+    """
+    pending = set()
+    finished = {}
+    next_index = 0
+    released = 0
+
+    async def map_chunk(index, start, end):
+        nonlocal released
+        # tasks start in creation order, so chunks are decoded in input order
+        text = chunk_text(buf, start, end)
+        released = release(buf, released, end)
+        if end - start == len(buf):
+            return index, await ask(f"{instruction}\n\n{text}")
+        return index, await ask(MAP_PROMPT.format(instruction=instruction, text=text))
+
+    async def collect():
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            pending.remove(task)
+            index, answer = task.result()
+            finished[index] = answer
+
+    try:
+        for index, (start, end) in enumerate(bounds):
+            while len(pending) >= concurrency:
+                await collect()
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+            pending.add(asyncio.create_task(map_chunk(index, start, end)))
+        while pending:
+            await collect()
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def map_reduce(
+    buf, instruction, ask, max_tokens=DEFAULT_CHUNK_TOKENS, concurrency=4
+):
+    """Answer `instruction` over `buf` chunk by chunk, then combine.
+
+    `ask` is an async callable from prompt to answer. At most `concurrency`
+    chunks are decoded and in flight at once, and finished answers are
+    reduced as soon as the ones before them are in, so memory does not
+    depend on the size of `buf`.
+    """
+    max_bytes = max_tokens * CHARS_PER_TOKEN
+    reducer = Reducer(instruction, ask, max_bytes)
+    chunks = 0
+    bounds = chunk_bounds(buf, max_bytes)
+    async for answer in map_chunks(buf, bounds, instruction, ask, concurrency):
+        await reducer.add(answer)
+        chunks += 1
+    answer = await reducer.result()
+    log.info(f"map-reduce: {chunks} chunks, {reducer.reduces} combine requests")
+    return answer
+
+
+async def summarize(
+    buf,
+    instruction,
+    ask,
+    max_tokens=DEFAULT_CHUNK_TOKENS,
+    concurrency=4,
+    fan_in=DEFAULT_FAN_IN,
+):
+    """Summarize `buf` with a concurrent map step and a tree of reduces.
+
+    Unlike map_reduce, chunks and the groups of each level are cut by
+    content, and all the combines of a level run at once, so with a cache
+    of completions a rerun over an edited input only asks again for the
+    changed chunks and the combines on their way to the root. The map
+    answers (one per chunk) are held in memory. Returns the summary and
+    the number of (chunks, combines).
+    """
+    max_bytes = max_tokens * CHARS_PER_TOKEN
+    bounds = content_bounds(buf, max_bytes)
+    answers = [
+        answer
+        async for answer in map_chunks(buf, bounds, instruction, ask, concurrency)
+    ]
+    chunks = len(answers)
+    combines = 0
+    level = 0
+    while len(answers) > 1:
+        level += 1
+        parts = content_groups(answers, max_bytes, fan_in)
+        answers = await asyncio.gather(
+            *(
+                ask(
+                    REDUCE_PROMPT.format(
+                        instruction=instruction, answers=SEPARATOR.join(part)
+                    )
+                )
+                for part in parts
+            )
+        )
+        combines += len(parts)
+        log.info(f"summarize: level {level}, {len(parts)} combines")
+    log.info(f"summarize: {chunks} chunks, {combines} combine requests")
+    return (answers[0] if answers else ""), (chunks, combines)
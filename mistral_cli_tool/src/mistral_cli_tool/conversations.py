@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from mistral_cli_tool import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+DEFAULT_HISTORY_DIR = os.path.join(
+    os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share")),
+    "mistral_cli_tool",
+)
+HISTORY_FILE = "conversations.sqlite3"
+DEFAULT_SNAPSHOT_EVERY = 50
+TITLE_CHARS = 80
+
+
+def new_session_id():
+    return uuid.uuid4().hex[:12]
+
+
+def message_from_json(role, body):
+    from mistralai.models import (
+        AssistantMessage,
+        SystemMessage,
+        ToolMessage,
+        UserMessage,
+    )
+
+    cls = {
+        "assistant": AssistantMessage,
+        "system": SystemMessage,
+        "tool": ToolMessage,
+        "user": UserMessage,
+    }[role]
+    return cls.model_validate_json(body)
+
+
+def searchable_text(message):
+    content = message.content
+    if content is None:
+        return ""
+    if not isinstance(content, str):
+        content = "".join(getattr(chunk, "text", "") for chunk in content)
+    return content
+
+
+class ConversationStore:
+    """Conversations on disk: an append-only message log plus snapshots.
+
+    Every message is appended once to `messages`, keyed by (session, seq).
+    Every `snapshot_every` messages the session's in-memory history, which
+    the history budget keeps bounded, is written as one row. Resuming reads
+    the snapshot and the few messages logged after it, so it costs the same
+    for a session of ten turns or ten thousand. Sessions are listed from an
+    index on their last update, and message text is searchable through an
+    FTS5 index.
+    """
+
+    def __init__(self, history_dir=DEFAULT_HISTORY_DIR, snapshot_every=None):
+        os.makedirs(history_dir, exist_ok=True)
+        self.path = os.path.join(history_dir, HISTORY_FILE)
+        self.snapshot_every = snapshot_every or DEFAULT_SNAPSHOT_EVERY
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                model TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                turns INTEGER NOT NULL DEFAULT 0,
+                last_seq INTEGER NOT NULL DEFAULT 0,
+                snapshot_seq INTEGER NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                body TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS snapshots (
+                session_id TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                body TEXT NOT NULL);
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+                text, session_id UNINDEXED, seq UNINDEXED);
+            """
+        )
+
+    def append(self, session_id, new_messages, history, model=None):
+        """Log the messages of one turn; snapshot `history` when it is due."""
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute(
+                    "SELECT last_seq, snapshot_seq FROM sessions WHERE id = ?",
+                    (session_id,),
+                ).fetchone()
+                if row is None:
+                    title = next(
+                        (searchable_text(m) for m in new_messages if m.role == "user"),
+                        "",
+                    )
+                    self.db.execute(
+                        "INSERT INTO sessions (id, title, model, created, updated)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (
+                            session_id,
+                            " ".join(title.split())[:TITLE_CHARS],
+                            model,
+                            now,
+                            now,
+                        ),
+                    )
+                    last_seq, snapshot_seq = 0, 0
+                else:
+                    last_seq, snapshot_seq = row
+                rows = []
+                for i, message in enumerate(new_messages, start=last_seq + 1):
+                    rows.append(
+                        (session_id, i, message.role, message.model_dump_json())
+                    )
+                self.db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?)", rows)
+                self.db.executemany(
+                    "INSERT INTO messages_fts VALUES (?, ?, ?)",
+                    [
+                        (searchable_text(m), session_id, i)
+                        for i, m in enumerate(new_messages, start=last_seq + 1)
+                        if m.role in ("user", "assistant") and searchable_text(m)
+                    ],
+                )
+                last_seq += len(rows)
+                if last_seq - snapshot_seq >= self.snapshot_every:
+                    self.snapshot(session_id, last_seq, history)
+                    snapshot_seq = last_seq
+                self.db.execute(
+                    "UPDATE sessions SET updated = ?, turns = turns + 1, last_seq = ?,"
+                    " snapshot_seq = ? WHERE id = ?",
+                    (now, last_seq, snapshot_seq, session_id),
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def snapshot(self, session_id, seq, history):
+        body = json.dumps([[m.role, m.model_dump_json()] for m in history])
+        self.db.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)", (session_id, seq, body)
+        )
+        log.info(f"session {session_id}: snapshot of {len(history)} messages at {seq}")
+
+    def load(self, session_id):
+        """Messages of a stored session, or None if there is no such session."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT snapshot_seq FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            snapshot = self.db.execute(
+                "SELECT seq, body FROM snapshots WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            seq = 0
+            messages = []
+            if snapshot is not None:
+                seq = snapshot[0]
+                messages = [message_from_json(*m) for m in json.loads(snapshot[1])]
+            tail = self.db.execute(
+                "SELECT role, body FROM messages WHERE session_id = ? AND seq > ?"
+                " ORDER BY seq",
+                (session_id, seq),
+            ).fetchall()
+        messages.extend(message_from_json(role, body) for role, body in tail)
+        log.info(
+            f"session {session_id}: restored {len(messages)} messages"
+            f" ({len(tail)} from the log)"
+        )
+        return messages
+
+    def list(self, limit=20):
+        with self.lock:
+            return self.db.execute(
+                "SELECT id, title, model, updated, turns FROM sessions"
+                " ORDER BY updated DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def search(self, query, limit=20):
+        """(session id, title, snippet, matches) of the sessions matching an
+        FTS5 query, best first, with the snippet of their best message."""
+        with self.lock:
+            # rowid is that of the min(rank) row of each session; snippet()
+            # is then only computed for those, it needs the MATCH again
+            best = self.db.execute(
+                "SELECT f.rowid, f.session_id, s.title, min(f.rank), count(*)"
+                " FROM messages_fts f JOIN sessions s ON s.id = f.session_id"
+                " WHERE messages_fts MATCH ? GROUP BY f.session_id"
+                " ORDER BY min(f.rank) LIMIT ?",
+                (query, limit),
+            ).fetchall()
+            rowids = [row[0] for row in best]
+            snippets = dict(
+                self.db.execute(
+                    "SELECT rowid, snippet(messages_fts, 0, '[', ']', '...', 12)"
+                    " FROM messages_fts WHERE messages_fts MATCH ?"
+                    f" AND rowid IN ({', '.join('?' * len(rowids))})",
+                    (query, *rowids),
+                ).fetchall()
+            )
+        return [
+            (session_id, title, snippets.get(rowid, ""), matches)
+            for rowid, session_id, title, _, matches in best
+        ]
+
+    def close(self):
+        self.db.close()
+
+
+def open_store(no_history, history_dir):
+    """Conversation store for a CLI run, or None when disabled or unusable."""
+    if no_history:
+        return None
+    try:
+        return ConversationStore(history_dir or DEFAULT_HISTORY_DIR)
+    except (OSError, sqlite3.Error) as e:
+        log.warning(f"conversation history disabled: {e}")
+        return None
@@ -0,0 +1,143 @@
+import json
+import logging
+
+from mistral_cli_tool import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+DEFAULT_MAX_HISTORY_TOKENS = 32000
+DEFAULT_MAX_TOOL_CHARS = 2000
+
+# rough average for English text and JSON, good enough for budgeting
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def message_text(message):
+    content = message.content
+    if content is None:
+        content = ""
+    elif not isinstance(content, str):
+        content = "".join(getattr(chunk, "text", "") for chunk in content)
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        arguments = tool_call.function.arguments
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments)
+        content += tool_call.function.name + arguments
+    return content
+
+
+def truncate_text(text, max_chars):
+    extra = len(text) - max_chars
+    if extra <= 0:
+        return text
+    return text[:max_chars] + f"\n[... {extra} characters truncated]"
+
+
+def estimate_tokens(message):
+    return MESSAGE_OVERHEAD_TOKENS + len(message_text(message)) // CHARS_PER_TOKEN
+
+
+class HistoryBudget:
+    """Keeps the conversation sent to the model under a token budget.
+
+    Token estimates and serialised sizes are cached per message. When the
+    history is over budget, tool outputs from earlier turns are cut down to
+    `max_tool_chars` first, then whole turns are dropped from the start
+    (sliding window). The current turn and leading system messages are always
+    kept. A `max_tokens` of 0 disables compaction; payload sizes are recorded
+    either way.
+    """
+
+    def __init__(
+        self,
+        max_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+        max_tool_chars=DEFAULT_MAX_TOOL_CHARS,
+    ):
+        self.max_tokens = max_tokens
+        self.max_tool_chars = max_tool_chars
+        self.payload_bytes = []
+        self._tokens = {}
+        self._bytes = {}
+        self._tools_bytes = (None, 0)
+
+    def tokens(self, message):
+        key = id(message)
+        if key not in self._tokens:
+            self._tokens[key] = estimate_tokens(message)
+        return self._tokens[key]
+
+    def size(self, message):
+        key = id(message)
+        if key not in self._bytes:
+            self._bytes[key] = len(message.model_dump_json())
+        return self._bytes[key]
+
+    def total_tokens(self, messages):
+        return sum(self.tokens(m) for m in messages)
+
+    def compact(self, messages):
+        """Shrink `messages` in place until it fits the budget."""
+        if not self.max_tokens:
+            return
+        total = self.total_tokens(messages)
+        if total <= self.max_tokens:
+            return
+        log.info(f"history over budget: ~{total} > {self.max_tokens} tokens")
+        current = last_turn_start(messages)
+        for message in messages[:current]:
+            if total <= self.max_tokens:
+                return
+            if self.truncate(message):
+                total -= self._tokens.pop(id(message))
+                self._bytes.pop(id(message), None)
+                total += self.tokens(message)
+        pinned = 0
+        while pinned < len(messages) and messages[pinned].role == "system":
+            pinned += 1
+        while total > self.max_tokens:
+            cut = next_turn_start(messages, pinned)
+            if cut is None:
+                break
+            for message in messages[pinned:cut]:
+                total -= self._tokens.pop(id(message), 0)
+                self._bytes.pop(id(message), None)
+            del messages[pinned:cut]
+        log.info(f"history compacted to {len(messages)} messages, ~{total} tokens")
+
+    def truncate(self, message):
+        if message.role != "tool":
+            return False
+        if not isinstance(message.content, str):
+            return False
+        if len(message.content) <= self.max_tool_chars:
+            return False
+        message.content = truncate_text(message.content, self.max_tool_chars)
+        return True
+
+    def record_payload(self, messages, tools):
+        # sizes are kept per message, so a step of a long turn only
+        # serialises the messages added since the previous one
+        if self._tools_bytes[0] is not tools:
+            self._tools_bytes = (tools, len(json.dumps(tools)))
+        size = sum(self.size(m) for m in messages) + self._tools_bytes[1]
+        self.payload_bytes.append(size)
+        log.info(
+            f"completion payload: {size} bytes, {len(messages)} messages,"
+            f" ~{self.total_tokens(messages)} tokens"
+        )
+        return size
+
+
+def last_turn_start(messages):
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].role == "user":
+            return i
+    return 0
+
+
+def next_turn_start(messages, start):
+    for i in range(start + 1, len(messages)):
+        if messages[i].role == "user":
+            return i
+    return None
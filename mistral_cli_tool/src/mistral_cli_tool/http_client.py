@@ -0,0 +1,65 @@
+import json
+import logging
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mistral_cli_tool import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+DEFAULT_POOL_SIZE = int(os.environ.get("MCP_HTTP_POOL_SIZE", 16))
+DEFAULT_TIMEOUT = float(os.environ.get("MCP_HTTP_TIMEOUT", 10))
+DEFAULT_MAX_BYTES = int(os.environ.get("MCP_HTTP_MAX_BYTES", 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+
+
+def make_session(pool_size=DEFAULT_POOL_SIZE):
+    """requests.Session keeping up to `pool_size` connections alive per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# shared by all tool calls, so repeated requests to a host reuse connections
+session = make_session()
+
+
+def get_bytes(url, params=None, timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_BYTES):
+    """GET `url` and return (response, body, truncated).
+
+    The body is streamed and reading stops after `max_bytes`, so a huge page
+    never ends up in memory as a whole.
+    """
+    with session.get(url, params=params, timeout=timeout, stream=True) as response:
+        chunks = []
+        size = 0
+        truncated = False
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                truncated = True
+                break
+        body = b"".join(chunks)[:max_bytes]
+    if truncated:
+        log.info(f"GET {url} truncated at {max_bytes} bytes")
+    return response, body, truncated
+
+
+def get_text(url, params=None, timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_BYTES):
+    response, body, truncated = get_bytes(url, params, timeout, max_bytes)
+    text = body.decode(response.encoding or "utf-8", errors="replace")
+    if truncated:
+        text += f"\n[truncated at {max_bytes} bytes]"
+    return text
+
+
+def get_json(url, params=None, timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_BYTES):
+    response, body, truncated = get_bytes(url, params, timeout, max_bytes)
+    if truncated:
+        raise ValueError(f"JSON response from {url} exceeds {max_bytes} bytes")
+    return json.loads(body)
@@ -1,32 +1,34 @@
 #!/usr/bin/env python3
 
-import os
-import json
-import csv
 import logging
 import sys
 import time
-import math
 from functools import update_wrapper
-import cProfile
-import pstats
-
-import asyncio
-from asyncio import Queue
 
 import click
 from dotenv import load_dotenv
 
-from mcp import ClientSession, StdioServerParameters, types
-from mcp.client.stdio import stdio_client
-
-from mistral_cli_tool.ai_client import AIClient
-
-from mistralai import Mistral
-from mistralai.models.assistantmessage import AssistantMessage
-from mistralai.models.function import Function
-from mistralai.models.toolmessage import ToolMessage
-from mistralai.models.usermessage import UserMessage
+# asyncio, the SDK, fastmcp and the client are imported in main() so that
+# --help and argument errors do not pay for them
+from mistral_cli_tool import (
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_TOKENS_PER_MINUTE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MAX_PARALLEL_TOOLS,
+    DEFAULT_TOOL_TIMEOUT,
+    DEFAULT_MAX_TOOL_STEPS,
+    DEFAULT_TURN_TIMEOUT,
+    DEFAULT_MAX_TOOL_OUTPUT,
+    DEFAULT_CHUNK_TOKENS,
+)
+from mistral_cli_tool.history import DEFAULT_MAX_HISTORY_TOKENS
+from mistral_cli_tool.tracing import (
+    TRACE_FORMATS,
+    format_duration,
+    profiled,
+    span,
+    tracer,
+)
 
 load_dotenv(".env")
 
@@ -49,16 +51,6 @@ log_levels = {
     "CRITICAL": logging.CRITICAL,
 }
 
-api_key = os.environ["MISTRAL_AI_KEY"]
-
-client = Mistral(api_key=api_key)
-
-server_params = StdioServerParameters(
-    command="python",  # Executable
-    args=["mcp_server.py"],  # Optional command line arguments
-    env=None,  # Optional environment variables
-)
-
 
 def log_decorator(f):
     @click.pass_context
@@ -72,21 +64,17 @@ def log_decorator(f):
     return update_wrapper(new_func, f)
 
 
-def time_decorator(f):
+def trace_decorator(f):
     @click.pass_context
     def new_func(ctx, *args, **kwargs):
+        tracer.start(ctx.params["trace_file"], ctx.params["trace_format"])
         t1 = time.perf_counter()
         try:
-            r = ctx.invoke(f, *args, **kwargs)
-            return r
-        except Exception as e:
-            raise e
+            with profiled(ctx.params["profile"]), span("run", command=ctx.info_name):
+                return ctx.invoke(f, *args, **kwargs)
         finally:
-            t2 = time.perf_counter()
-            mins = math.floor(t2 - t1) // 60
-            hours = mins // 60
-            secs = (t2 - t1) - 60 * mins - 3600 * hours
-            log.info(f"Execution in {hours:02d}:{mins:02d}:{secs:0.4f}")
+            log.info(f"Execution in {format_duration(time.perf_counter() - t1)}")
+            tracer.stop()
 
     return update_wrapper(new_func, f)
 
@@ -110,6 +98,151 @@ def time_decorator(f):
     type=click.Path(readable=True, file_okay=True, dir_okay=False),
     default="-",
 )
+@click.option(
+    "--chunked",
+    help="Answer the prompt over the input file chunk by chunk, then combine",
+    is_flag=True,
+)
+@click.option(
+    "--chunk-tokens",
+    help="Size of one chunk with --chunked",
+    type=click.IntRange(min=100),
+    default=DEFAULT_CHUNK_TOKENS,
+    show_default=True,
+)
+@click.option(
+    "--concurrency",
+    help="Chunks in flight with --chunked",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+)
+@click.option(
+    "--rpm",
+    help="Requests per minute allowed by the API key, 0 for unlimited",
+    type=float,
+    default=DEFAULT_REQUESTS_PER_MINUTE,
+    show_default=True,
+    envvar="MISTRAL_RPM",
+)
+@click.option(
+    "--tpm",
+    help="Tokens per minute allowed by the API key, 0 for unlimited",
+    type=float,
+    default=DEFAULT_TOKENS_PER_MINUTE,
+    show_default=True,
+    envvar="MISTRAL_TPM",
+)
+@click.option(
+    "--max-retries",
+    help="Retries on 429/5xx responses",
+    type=int,
+    default=DEFAULT_MAX_RETRIES,
+    show_default=True,
+)
+@click.option(
+    "--max-parallel-tools",
+    help="Maximum tool calls run concurrently",
+    type=int,
+    default=DEFAULT_MAX_PARALLEL_TOOLS,
+    show_default=True,
+)
+@click.option(
+    "--tool-timeout",
+    help="Timeout for a single tool call in seconds",
+    type=float,
+    default=DEFAULT_TOOL_TIMEOUT,
+    show_default=True,
+)
+@click.option(
+    "--max-tool-steps",
+    help="Rounds of tool calls per turn before the model must answer",
+    type=int,
+    default=DEFAULT_MAX_TOOL_STEPS,
+    show_default=True,
+)
+@click.option(
+    "--turn-timeout",
+    help="Deadline for a whole turn, tool calls included, in seconds",
+    type=float,
+    default=DEFAULT_TURN_TIMEOUT,
+    show_default=True,
+)
+@click.option(
+    "--max-tool-output",
+    help="Characters of a tool result kept in the history, 0 for unlimited",
+    type=int,
+    default=DEFAULT_MAX_TOOL_OUTPUT,
+    show_default=True,
+)
+@click.option(
+    "--stream/--no-stream",
+    help="Print the reply as it is generated",
+    default=False,
+    show_default=True,
+)
+@click.option(
+    "--max-history-tokens",
+    help="Token budget for the conversation history, 0 for unlimited",
+    type=int,
+    default=DEFAULT_MAX_HISTORY_TOKENS,
+    show_default=True,
+)
+@click.option(
+    "--no-cache",
+    help="Do not read or write the completion cache",
+    is_flag=True,
+)
+@click.option(
+    "--cache-dir",
+    help="Completion cache directory [default: ~/.cache/mistral_cli_tool]",
+    type=click.Path(file_okay=False),
+    envvar="MISTRAL_CACHE_DIR",
+)
+@click.option(
+    "--resume",
+    help="Continue a stored conversation by its id",
+    metavar="ID",
+)
+@click.option(
+    "--list-sessions",
+    help="List stored conversations, most recent first, and exit",
+    is_flag=True,
+)
+@click.option(
+    "--search",
+    help="Search stored conversations (SQLite FTS5 query) and exit",
+    metavar="TEXT",
+)
+@click.option(
+    "--no-history",
+    help="Do not store the conversation",
+    is_flag=True,
+)
+@click.option(
+    "--history-dir",
+    help="Conversation store directory [default: ~/.local/share/mistral_cli_tool]",
+    type=click.Path(file_okay=False),
+    envvar="MISTRAL_HISTORY_DIR",
+)
+@click.option(
+    "--trace-file",
+    help="Append per-phase spans to this file",
+    type=click.Path(dir_okay=False, writable=True),
+    envvar="MISTRAL_TRACE_FILE",
+)
+@click.option(
+    "--trace-format",
+    help="Span format, flat JSON lines or OpenTelemetry OTLP/JSON",
+    type=click.Choice(TRACE_FORMATS),
+    default="jsonl",
+    show_default=True,
+)
+@click.option(
+    "--profile",
+    help="Print a cProfile report of the run to stderr",
+    is_flag=True,
+)
 @click.option(
     "--log-level",
     default="WARNING",
@@ -119,39 +252,192 @@ def time_decorator(f):
     envvar="LOG_LEVEL",
 )
 @log_decorator
-@time_decorator
-def main(prompt, model, api_key, input_file, log_level):
+@trace_decorator
+def main(
+    prompt,
+    model,
+    api_key,
+    input_file,
+    chunked,
+    chunk_tokens,
+    concurrency,
+    rpm,
+    tpm,
+    max_retries,
+    max_parallel_tools,
+    tool_timeout,
+    max_tool_steps,
+    turn_timeout,
+    max_tool_output,
+    stream,
+    max_history_tokens,
+    no_cache,
+    cache_dir,
+    resume,
+    list_sessions,
+    search,
+    no_history,
+    history_dir,
+    trace_file,
+    trace_format,
+    profile,
+    log_level,
+):
     """Console script for hey_ai."""
     # ======================================================================
     #                        Your script starts here!
     # ======================================================================
+    from mistral_cli_tool.conversations import open_store
+
+    if list_sessions or search:
+        store = open_store(no_history, history_dir)
+        if store is None:
+            raise click.ClickException("conversation history is disabled")
+        show_sessions(store, search)
+        return 0
+
     one_pass = False
-    if input_file == "-" and sys.stdin.isatty() and len(prompt) > 0:
+    if chunked:
+        if input_file == "-":
+            raise click.UsageError("--chunked needs --input-file")
+        if not prompt:
+            raise click.UsageError("--chunked needs a prompt to apply to each chunk")
+        one_pass = True
+        in_data = None
+    elif input_file == "-" and sys.stdin.isatty() and len(prompt) > 0:
         one_pass = True
         in_data = " ".join(prompt)
     elif input_file != "-":
         one_pass = True
-        with click.open_file(input_file, "r") as f:
+        with span("input.read"), click.open_file(input_file, "r") as f:
             in_data = f.read()
     else:
         in_data = ""
 
+    # opened only when used: one-shot prompts are only stored when they
+    # continue a session, and every chunk is a conversation of its own
+    store = None
+    if resume or not one_pass:
+        store = open_store(no_history, history_dir)
+    messages = []
+    if resume:
+        if store is None:
+            raise click.ClickException("--resume needs the conversation history")
+        with span("history.load"):
+            messages = store.load(resume)
+        if messages is None:
+            raise click.ClickException(f"no stored conversation {resume}")
+
+    import asyncio
+    from asyncio import Queue
+
+    from mistral_cli_tool.ai_client import AIClient
+    from mistral_cli_tool.cache import DEFAULT_CACHE_DIR, open_cache
+    from mistral_cli_tool.catalogue import ToolCatalogue
+    from mistral_cli_tool.rate_limit import RateLimiter
+
     input_queue = Queue()
     output_queue = Queue()
+    catalogue = None
+    if not no_cache:
+        catalogue = ToolCatalogue(cache_dir or DEFAULT_CACHE_DIR)
 
-    client = AIClient(api_key, model, input_queue, output_queue)
+    with span("client.construct"):
+        client = AIClient(
+            api_key,
+            model,
+            input_queue,
+            output_queue,
+            limiter=RateLimiter(rpm, tpm, max_retries),
+            max_parallel_tools=max_parallel_tools,
+            tool_timeout=tool_timeout,
+            max_tool_steps=max_tool_steps,
+            turn_timeout=turn_timeout,
+            max_tool_output=max_tool_output,
+            stream=stream,
+            max_history_tokens=max_history_tokens,
+            cache=open_cache(no_cache, cache_dir),
+            catalogue=catalogue,
+            store=None if chunked else store,
+            session_id=resume,
+        )
+        client.messages = messages
+    if chunked:
+        reply = asyncio.run(
+            run_chunked(
+                client,
+                " ".join(prompt),
+                input_file,
+                chunk_tokens,
+                concurrency,
+                max_history_tokens,
+            )
+        )
+        with span("output.render"):
+            click.secho(reply, fg="green")
+        return 0
+    if client.store is not None and not one_pass:
+        click.echo(f"Session {client.id}")
     asyncio.run(run_it(client, input_queue, output_queue, in_data, one_pass))
     return 0
 
 
+async def run_chunked(
+    client, instruction, input_file, chunk_tokens, concurrency, max_history_tokens
+):
+    """Map-reduce `instruction` over a memory-mapped input file.
+
+    Every chunk and every combine step is a one-turn session of a
+    SessionManager, so tools are available to each of them.
+    """
+    import itertools
+
+    from mistral_cli_tool.chunking import map_reduce, mapped
+    from mistral_cli_tool.sessions import SessionManager
+
+    manager = SessionManager(
+        client, max_active_turns=concurrency, max_history_tokens=max_history_tokens
+    )
+    session_ids = itertools.count()
+
+    async def ask(prompt):
+        session_id = f"chunk-{next(session_ids)}"
+        try:
+            return await manager.ask(session_id, prompt)
+        finally:
+            manager.close(session_id)
+
+    await manager.start()
+    try:
+        with span("input.map", path=input_file), mapped(input_file) as buf:
+            return await map_reduce(buf, instruction, ask, chunk_tokens, concurrency)
+    finally:
+        await manager.stop()
+
+
+def show_sessions(store, query):
+    if query:
+        import sqlite3
+
+        try:
+            matches = store.search(query)
+        except sqlite3.OperationalError as e:
+            raise click.ClickException(f"bad search query: {e}")
+        for session_id, title, snippet, count in matches:
+            click.echo(f"{session_id}  {title}  ({count} matching messages)")
+            click.secho(f"    {snippet}", fg="green")
+        return
+    for session_id, title, model, updated, turns in store.list():
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(updated))
+        click.echo(f"{session_id}  {when}  {turns:4d} turns  {model}  {title}")
+
+
 async def run_it(client, input_queue, output_queue, in_data, one_pass):
     await client.start_loop()
     if one_pass:
         await input_queue.put(in_data)
         await input_queue.put(None)
-        output_msg = await output_queue.get()
-        click.secho(output_msg, fg="green")
-        output_queue.task_done()
+        await print_reply(output_queue, client.stream, time.perf_counter())
         output_fin = await output_queue.get()
         output_queue.task_done()
         await input_queue.join()
@@ -168,16 +454,38 @@ async def run_it(client, input_queue, output_queue, in_data, one_pass):
             else:
                 await input_queue.put(message)
             log.info("message sent")
-            reply = await output_queue.get()
-            log.info(reply)
-            if reply is None:
-                output_queue.task_done()
+            if not await print_reply(output_queue, client.stream, time.perf_counter()):
                 break
-            click.secho(reply, fg="green")
-            output_queue.task_done()
     log.debug("before end_loop")
     await client.end_loop()
 
 
+async def print_reply(output_queue, stream, sent_at):
+    """Echo one reply, chunk by chunk when streaming.
+
+    Returns False once the worker has signalled the end of the conversation.
+    """
+    from mistral_cli_tool.ai_client import TURN_END
+
+    first = True
+    while True:
+        reply = await output_queue.get()
+        output_queue.task_done()
+        if first:
+            log.info(f"Time to first byte: {time.perf_counter() - sent_at:0.4f}s")
+            first = False
+        log.debug(reply)
+        if reply is None:
+            return False
+        with span("output.render", stream=stream):
+            if not stream:
+                click.secho(reply, fg="green")
+                return True
+            if reply is TURN_END:
+                click.echo()
+                return True
+            click.secho(reply, fg="green", nl=False)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastmcp import Client
+from fastmcp.exceptions import ClientError
+
+from mistral_cli_tool import LOGGER_NAME
+from mistral_cli_tool.tracing import span
+
+log = logging.getLogger(LOGGER_NAME)
+
+DEFAULT_HEALTH_INTERVAL = 30.0
+DEFAULT_PING_TIMEOUT = 5.0
+
+
+class PoolStats:
+    def __init__(self):
+        self.handshakes = 0
+        self.handshakes_saved = 0
+        self.reconnects = 0
+        self.tool_calls = 0
+        self.tool_time = 0.0
+        self.tool_time_max = 0.0
+
+    def record_call(self, elapsed):
+        self.tool_calls += 1
+        self.tool_time += elapsed
+        self.tool_time_max = max(self.tool_time_max, elapsed)
+
+    def as_dict(self):
+        return {
+            "handshakes": self.handshakes,
+            "handshakes_saved": self.handshakes_saved,
+            "reconnects": self.reconnects,
+            "tool_calls": self.tool_calls,
+            "tool_latency_avg": (
+                self.tool_time / self.tool_calls if self.tool_calls else 0.0
+            ),
+            "tool_latency_max": self.tool_time_max,
+        }
+
+
+class _Slot:
+    """One long-lived MCP session.
+
+    The session is entered and exited by a dedicated holder task, because the
+    transports use anyio task groups that must be closed by the task that
+    opened them.
+    """
+
+    def __init__(self, mcp_server):
+        self.mcp_server = mcp_server
+        self.client = None
+        self.error = None
+        self.connects = 0
+        self.lock = asyncio.Lock()
+        self._task = None
+        self._stop = None
+
+    async def connect(self):
+        ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self.error = None
+        self._task = asyncio.create_task(self._hold(ready))
+        await ready.wait()
+        if self.client is None:
+            raise ConnectionError(f"MCP connect failed: {self.error}")
+
+    async def _hold(self, ready):
+        try:
+            async with Client(self.mcp_server) as client:
+                self.client = client
+                ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self.error = e
+            log.warning(f"MCP session closed: {e!r}")
+        finally:
+            self.client = None
+            ready.set()
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class MCPSessionPool:
+    """Keeps MCP sessions open between turns instead of reconnecting per call.
+
+    Sessions are opened on `start` (or lazily on first use), pinged every
+    `health_interval` seconds and reopened when a ping or a call fails on the
+    transport. Errors reported by the tool itself are passed through as is.
+    """
+
+    def __init__(
+        self,
+        mcp_server,
+        size=1,
+        health_interval=DEFAULT_HEALTH_INTERVAL,
+        ping_timeout=DEFAULT_PING_TIMEOUT,
+    ):
+        self.mcp_server = mcp_server
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.size = max(1, size)
+        self.stats = PoolStats()
+        self._slots = [_Slot(mcp_server) for _ in range(self.size)]
+        self._next = 0
+        self._health_task = None
+
+    async def start(self):
+        for slot in self._slots:
+            async with slot.lock:
+                if slot.client is None:
+                    await self._connect(slot)
+        if self.health_interval and self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for slot in self._slots:
+            await slot.close()
+        log.info(f"MCP pool stats: {self.stats.as_dict()}")
+
+    async def _connect(self, slot):
+        await slot.close()
+        if slot.connects:
+            self.stats.reconnects += 1
+        slot.connects += 1
+        with span("mcp.handshake", reconnect=slot.connects > 1):
+            await slot.connect()
+        self.stats.handshakes += 1
+
+    def _pick(self):
+        slot = self._slots[self._next]
+        self._next = (self._next + 1) % len(self._slots)
+        return slot
+
+    @asynccontextmanager
+    async def session(self):
+        slot = self._pick()
+        async with slot.lock:
+            if slot.client is None:
+                await self._connect(slot)
+            else:
+                self.stats.handshakes_saved += 1
+        yield slot.client
+
+    async def call_tool(self, name, arguments=None):
+        for attempt in range(2):
+            t1 = time.perf_counter()
+            async with self.session() as client:
+                try:
+                    result = await client.call_tool(name, arguments=arguments)
+                except ClientError:
+                    raise
+                except Exception as e:
+                    if attempt:
+                        raise
+                    log.warning(f"MCP call {name} failed on transport: {e!r}")
+                    await self._drop(client)
+                    continue
+            self.stats.record_call(time.perf_counter() - t1)
+            return result
+
+    async def _drop(self, client):
+        for slot in self._slots:
+            if slot.client is client:
+                async with slot.lock:
+                    await slot.close()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for slot in self._slots:
+                async with slot.lock:
+                    try:
+                        if slot.client is None:
+                            await self._connect(slot)
+                        else:
+                            await asyncio.wait_for(
+                                slot.client.ping(), self.ping_timeout
+                            )
+                    except Exception as e:
+                        log.warning(f"MCP health check failed: {e!r}")
+                        try:
+                            await self._connect(slot)
+                        except Exception as e:
+                            log.warning(f"MCP reconnect failed: {e!r}")
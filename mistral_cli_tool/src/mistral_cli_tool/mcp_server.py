@@ -1,4 +1,4 @@
-import requests
+import json
 import logging
 import os
 
@@ -6,9 +6,14 @@ from typing import Annotated
 from pydantic import Field
 from datetime import datetime
 
+import anyio
+import click
+import uvicorn
 from fastmcp import FastMCP
 
 from mistral_cli_tool import LOGGER_NAME
+from mistral_cli_tool.http_client import get_json, get_text
+from mistral_cli_tool.ttl_cache import TTLCache
 
 log = logging.getLogger(LOGGER_NAME)
 
@@ -16,6 +21,15 @@ MCP_SERVER_NAME = "MistralCLIServer"
 
 mcp_server = FastMCP(name=MCP_SERVER_NAME)
 
+# fastmcp runs sync tools on the event loop, which stalls every other session
+# while one waits on the network; blocking work goes to this many threads
+TOOL_THREADS = int(os.environ.get("MCP_TOOL_THREADS", 32))
+tool_limiter = anyio.CapacityLimiter(TOOL_THREADS)
+
+
+async def run_blocking(fn, *args):
+    return await anyio.to_thread.run_sync(fn, *args, limiter=tool_limiter)
+
 
 @mcp_server.resource("greeting://{name}")
 def get_greeting(name: Annotated[str, Field(description="Name to greet")]) -> str:
@@ -24,16 +38,23 @@ def get_greeting(name: Annotated[str, Field(description="Name to greet")]) -> st
 
 
 @mcp_server.tool()
-def simple_get(url: str) -> str:
+async def simple_get(url: str) -> str:
     """Get URL"""
-    return requests.get(url).text
+    return await run_blocking(get_text, url)
 
 
 WEATHER_API_KEY = os.environ.get("WEATHER_API_KEY")
 
+# many sessions ask about the same few places, weatherapi.com updates every
+# ~15 minutes anyway
+weather_cache = TTLCache(
+    ttl=float(os.environ.get("WEATHER_CACHE_TTL", 600)),
+    stale=float(os.environ.get("WEATHER_CACHE_STALE", 1800)),
+)
+
 
 @mcp_server.tool()
-def weather(
+async def weather(
     location: Annotated[
         str,
         Field(
@@ -44,19 +65,62 @@ def weather(
     """Get current weather for location specified by City (London) or ZIP (10001) or IATA (DXB) or coordinates (48.8567,2.3508)"""
     if not WEATHER_API_KEY:
         return "No weather API key provided"
-    return (
-        requests.get(
-            f"https://api.weatherapi.com/v1/current.json?q={location}&key={WEATHER_API_KEY}"
-        )
-        .json()
-        .get("current", {})
+    location = " ".join(location.split()).lower()
+    return await run_blocking(
+        weather_cache.get_or_load, location, lambda: fetch_weather(location)
     )
 
 
+def fetch_weather(location):
+    return get_json(
+        "https://api.weatherapi.com/v1/current.json",
+        params={"q": location, "key": WEATHER_API_KEY},
+    ).get("current", {})
+
+
+@mcp_server.resource("stats://weather-cache", mime_type="application/json")
+def weather_cache_stats() -> str:
+    """Hit/miss counters of the weather cache."""
+    return json.dumps(weather_cache.stats())
+
+
 @mcp_server.tool()
 def time():
     return datetime.now().strftime("%a %d %b %Y, %I:%M%p")
 
 
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8000, show_default=True)
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    help="Server processes behind the port, sessions stick to one of them",
+)
+@click.option(
+    "--log-level",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR"], case_sensitive=False),
+    default="INFO",
+    show_default=True,
+)
+def serve(host, port, workers, log_level):
+    """Run the MCP server over SSE."""
+    logging.basicConfig(level=log_level.upper())
+    if workers > 1:
+        from mistral_cli_tool.mcp_workers import run_workers
+
+        run_workers(host, port, workers, log_level)
+    else:
+        uvicorn.run(
+            mcp_server.sse_app(),
+            host=host,
+            port=port,
+            log_level=log_level.lower(),
+            # open SSE streams would otherwise hold up shutdown forever
+            timeout_graceful_shutdown=2,
+        )
+
+
 if __name__ == "__main__":
-    mcp_server.run(transport="sse")
+    serve()
@@ -0,0 +1,173 @@
+import itertools
+import logging
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from mistral_cli_tool import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+SSE_PATH = "/sse"
+MESSAGE_PATH = "/messages/"
+# first event of an SSE session: "event: endpoint\r\ndata: /messages/?session_id=..."
+SESSION_RE = re.compile(rb"session_id=([0-9a-fA-F]+)")
+HOP_HEADERS = {"host", "content-length", "connection", "transfer-encoding"}
+
+
+class StickyRouter:
+    """Spread SSE sessions over workers and keep each session on its worker.
+
+    An MCP SSE session is a GET stream plus POSTs that must reach the process
+    holding that stream. New streams go to the workers round-robin; the
+    session id is read from the stream's first event, and POSTs for it are
+    forwarded to the same worker until the stream closes.
+    """
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.sessions = {}
+        self._next = itertools.cycle(backends)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30, read=None),
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=64),
+        )
+
+    def app(self):
+        return Starlette(
+            routes=[
+                Route(SSE_PATH, self.handle_sse, methods=["GET"]),
+                Route(MESSAGE_PATH, self.handle_message, methods=["POST"]),
+            ],
+            on_shutdown=[self.client.aclose],
+        )
+
+    async def handle_sse(self, request: Request):
+        backend = next(self._next)
+        upstream = await self.client.send(
+            self.client.build_request(
+                "GET", backend + SSE_PATH, headers=forward_headers(request)
+            ),
+            stream=True,
+        )
+
+        async def events():
+            session_id = None
+            head = b""
+            try:
+                async for chunk in upstream.aiter_raw():
+                    if session_id is None:
+                        head += chunk
+                        match = SESSION_RE.search(head)
+                        if match:
+                            session_id = match.group(1).decode()
+                            self.sessions[session_id] = backend
+                            log.debug(f"session {session_id} -> {backend}")
+                    yield chunk
+            finally:
+                await upstream.aclose()
+                if session_id is not None:
+                    self.sessions.pop(session_id, None)
+
+        return StreamingResponse(
+            events(),
+            status_code=upstream.status_code,
+            headers={k: v for k, v in upstream.headers.items() if k not in HOP_HEADERS},
+        )
+
+    async def handle_message(self, request: Request):
+        backend = self.sessions.get(request.query_params.get("session_id"))
+        if backend is None:
+            return Response("Could not find session", status_code=404)
+        upstream = await self.client.post(
+            backend + MESSAGE_PATH,
+            params=request.query_params,
+            content=await request.body(),
+            headers=forward_headers(request),
+        )
+        return Response(
+            upstream.content,
+            status_code=upstream.status_code,
+            headers={k: v for k, v in upstream.headers.items() if k not in HOP_HEADERS},
+        )
+
+
+def forward_headers(request):
+    return {k: v for k, v in request.headers.items() if k not in HOP_HEADERS}
+
+
+def free_port(host):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"worker on port {port} did not start")
+
+
+def stop(proc, timeout=5):
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def run_workers(host, port, workers, log_level="INFO"):
+    """Run `workers` server processes on local ports behind one public port."""
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    ports = [free_port("127.0.0.1") for _ in range(workers)]
+    procs = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "mistral_cli_tool.mcp_server",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(p),
+                "--log-level",
+                log_level,
+            ]
+        )
+        for p in ports
+    ]
+    try:
+        for p in ports:
+            wait_for_port("127.0.0.1", p)
+        log.info(f"{workers} MCP workers on ports {ports}")
+        router = StickyRouter([f"http://127.0.0.1:{p}" for p in ports])
+        app = router.app()
+        # uvicorn re-raises SIGTERM after shutdown, so stop the workers before
+        app.router.on_shutdown.append(lambda: [stop(proc) for proc in procs])
+        uvicorn.run(
+            app,
+            host=host,
+            port=port,
+            log_level=log_level.lower(),
+            timeout_graceful_shutdown=2,
+        )
+    finally:
+        for proc in procs:
+            stop(proc)
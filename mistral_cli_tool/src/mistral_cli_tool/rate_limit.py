@@ -0,0 +1,195 @@
+import asyncio
+import email.utils
+import json
+import logging
+import random
+import threading
+import time
+
+from mistral_cli_tool import (
+    LOGGER_NAME,
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_TOKENS_PER_MINUTE,
+    DEFAULT_MAX_RETRIES,
+)
+from mistral_cli_tool.cache import normalize
+
+log = logging.getLogger(LOGGER_NAME)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_BACKOFF = 60.0
+# reply tokens reserved up front, corrected once the usage is known
+REPLY_TOKENS = 256
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages, tools=None):
+    """Rough token count of a request, for the tokens/min bucket."""
+    size = len(json.dumps(normalize(messages)))
+    if tools:
+        size += len(json.dumps(tools))
+    return size // CHARS_PER_TOKEN + REPLY_TOKENS
+
+
+def payload_tokens(size):
+    """Token estimate of a request whose messages and tools take `size` bytes."""
+    return size // CHARS_PER_TOKEN + REPLY_TOKENS
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def error_status(error):
+    """(status, retry_after) of an SDK or requests error, (None, None) else."""
+    response = getattr(error, "raw_response", None)
+    if response is None:
+        response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+    return status, parse_retry_after(headers.get("Retry-After"))
+
+
+def usage_tokens(response):
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+class _Bucket:
+    def __init__(self, per_minute, capacity):
+        self.rate = per_minute / 60
+        self.capacity = capacity
+        self.level = capacity
+        self.stamp = time.monotonic()
+
+    def reserve(self, amount, now, factor):
+        """Take `amount`, going into debt if needed; seconds until covered."""
+        rate = self.rate * factor
+        self.level = min(self.capacity, self.level + (now - self.stamp) * rate)
+        self.stamp = now
+        self.level -= amount
+        return max(0.0, -self.level / rate)
+
+
+class RateLimiter:
+    """Token-bucket pacing for the requests/min and tokens/min limits.
+
+    `acquire(tokens)` (or `await acquire_async(tokens)`) waits until both
+    buckets can cover one more request. Requests may burst up to one
+    second's worth, tokens up to one minute's worth; a limit of 0 disables
+    that bucket. Reservations are made under a lock and waited out
+    afterwards, so one limiter can be shared by threads and tasks alike.
+
+    `call()` and `call_async()` also retry 429 and 5xx responses with
+    exponential backoff and full jitter, never sooner than Retry-After. A
+    429 pauses every caller and halves the rate, which then recovers by 5%
+    per successful request.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+        max_retries=DEFAULT_MAX_RETRIES,
+    ):
+        self.requests = None
+        self.tokens = None
+        if requests_per_minute:
+            self.requests = _Bucket(
+                requests_per_minute, max(1.0, requests_per_minute / 60)
+            )
+        if tokens_per_minute:
+            self.tokens = _Bucket(tokens_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.factor = 1.0
+        self.hold_until = 0.0
+        self.waited = 0.0
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens=0):
+        now = time.monotonic()
+        with self.lock:
+            delay = max(0.0, self.hold_until - now)
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1, now, self.factor))
+            if self.tokens is not None and tokens:
+                delay = max(delay, self.tokens.reserve(tokens, now, self.factor))
+            self.waited += delay
+        if delay:
+            log.debug(f"rate limit: waiting {delay:0.3f}s")
+        return delay
+
+    def acquire(self, tokens=0):
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=0):
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def settle(self, reserved, used):
+        """Correct a token reservation once the real usage is known."""
+        with self.lock:
+            if self.tokens is not None and used is not None:
+                self.tokens.level += reserved - used
+            self.factor = min(1.0, self.factor + 0.05)
+
+    def backoff(self, attempt, error):
+        """Seconds to wait before retrying `error`, or None to give up."""
+        status, retry_after = error_status(error)
+        if status not in RETRY_STATUS or attempt >= self.max_retries:
+            return None
+        delay = random.uniform(0, min(MAX_BACKOFF, 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        with self.lock:
+            self.retries += 1
+            if status == 429:
+                self.factor = max(0.1, self.factor / 2)
+                self.hold_until = max(self.hold_until, time.monotonic() + delay)
+        log.warning(f"HTTP {status}, retrying in {delay:0.1f}s")
+        return delay
+
+    def call(self, fn, tokens=0, usage=usage_tokens):
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self.backoff(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.settle(tokens, usage(result))
+            return result
+
+    async def call_async(self, fn, tokens=0, usage=usage_tokens):
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(tokens)
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self.backoff(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.settle(tokens, usage(result))
+            return result
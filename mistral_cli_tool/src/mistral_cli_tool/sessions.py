@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from mistral_cli_tool import LOGGER_NAME
+from mistral_cli_tool.ai_client import TURN_END
+from mistral_cli_tool.history import (
+    HistoryBudget,
+    DEFAULT_MAX_HISTORY_TOKENS,
+    DEFAULT_MAX_TOOL_CHARS,
+)
+
+log = logging.getLogger(LOGGER_NAME)
+
+DEFAULT_MAX_ACTIVE_TURNS = 8
+
+
+class Session:
+    """One conversation: its history, queued queries and replies."""
+
+    def __init__(
+        self,
+        session_id,
+        max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+        max_tool_chars=DEFAULT_MAX_TOOL_CHARS,
+    ):
+        self.id = session_id
+        self.messages = list()
+        self.history = HistoryBudget(max_history_tokens, max_tool_chars)
+        self.output_queue = asyncio.Queue()
+        self.pending = deque()
+        # one ask() at a time reads the output queue, so replies don't mix
+        self.reader = asyncio.Lock()
+        self.scheduled = False
+        self.turns = 0
+        self.last_active = time.monotonic()
+
+
+class SessionManager:
+    """Many conversations served by one AIClient.
+
+    All sessions share the client's completion client, MCP pool, rate limiter
+    and tool limiter; each has its own history and output queue. At most
+    `max_active_turns` turns run at once. Sessions with queued queries take
+    turns round-robin, one turn at a time, so a session with a long backlog
+    cannot starve the others. Turns of one session always run in order.
+    When the client has a conversation store, sessions are resumed from it
+    and every turn is appended to it.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_active_turns=DEFAULT_MAX_ACTIVE_TURNS,
+        max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+        max_tool_chars=DEFAULT_MAX_TOOL_CHARS,
+    ):
+        self.client = client
+        self.max_active_turns = max(1, max_active_turns)
+        self.max_history_tokens = max_history_tokens
+        self.max_tool_chars = max_tool_chars
+        self.sessions = dict()
+        self._ready = asyncio.Queue()
+        self._workers = []
+
+    def session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(
+                session_id, self.max_history_tokens, self.max_tool_chars
+            )
+            if self.client.store is not None:
+                session.messages = self.client.store.load(session_id) or []
+            log.info(f"session {session_id} opened, {len(self.sessions)} open")
+        return session
+
+    def close(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            log.info(f"session {session_id} closed after {session.turns} turns")
+
+    def close_idle(self, max_idle):
+        now = time.monotonic()
+        for session in list(self.sessions.values()):
+            idle = not session.pending and not session.scheduled
+            if idle and now - session.last_active > max_idle:
+                self.close(session.id)
+
+    async def start(self):
+        await self.client.mcp_pool.start()
+        self._workers = [
+            asyncio.create_task(self.worker()) for _ in range(self.max_active_turns)
+        ]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.client.mcp_pool.stop()
+
+    def submit(self, session_id, user_query):
+        """Queue a query; replies arrive on the session's output queue."""
+        session = self.session(session_id)
+        session.pending.append(user_query)
+        session.last_active = time.monotonic()
+        if not session.scheduled:
+            session.scheduled = True
+            self._ready.put_nowait(session)
+        return session
+
+    async def ask(self, session_id, user_query):
+        """Queue a query and wait for the complete reply."""
+        session = self.session(session_id)
+        async with session.reader:
+            self.submit(session_id, user_query)
+            if not self.client.stream:
+                reply = await session.output_queue.get()
+                session.output_queue.task_done()
+                return reply
+            chunks = []
+            while True:
+                chunk = await session.output_queue.get()
+                session.output_queue.task_done()
+                if chunk is TURN_END:
+                    return "".join(chunks)
+                chunks.append(chunk)
+
+    async def worker(self):
+        while True:
+            session = await self._ready.get()
+            user_query = session.pending.popleft()
+            try:
+                await self.client.single_pass(user_query, session)
+            except Exception as e:
+                log.exception(f"session {session.id}: turn failed")
+                await self.fail_turn(session, e)
+            session.turns += 1
+            session.last_active = time.monotonic()
+            if session.pending and session.id in self.sessions:
+                # back of the line, behind every other waiting session
+                self._ready.put_nowait(session)
+            else:
+                session.scheduled = False
+
+    async def fail_turn(self, session, error):
+        await session.output_queue.put(f"Error: {error}")
+        if self.client.stream:
+            await session.output_queue.put(TURN_END)
@@ -0,0 +1,191 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from mistral_cli_tool import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+TRACE_FORMATS = ["jsonl", "otlp"]
+SERVICE_NAME = "mistral_cli_tool"
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+def format_duration(seconds):
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:07.4f}"
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "attributes", "error")
+
+    def __init__(self, name, parent_id, attributes):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class _NoSpan:
+    def set(self, **attributes):
+        pass
+
+
+class Tracer:
+    """Timed, nested spans for the phases of a run.
+
+    Nothing is recorded until `start()`. Finished spans are appended to
+    `path` as they end, either as flat JSON lines or as OTLP/JSON export
+    requests (one per line, the format of the OpenTelemetry collector's
+    file exporter); only per-name totals are kept in memory. Parents are
+    tracked with a context variable, so spans opened in asyncio tasks nest
+    under the span that created the task.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.format = "jsonl"
+        self.trace_id = None
+        self.totals = dict()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def start(self, path=None, format="jsonl"):
+        self.enabled = True
+        self.path = path
+        self.format = format
+        self.trace_id = os.urandom(16).hex()
+        self.totals = dict()
+        if path:
+            self._file = open(path, "a")
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for name, (count, total, longest) in sorted(self.totals.items()):
+            log.info(f"span {name}: {count}x, total {total:0.4f}s, max {longest:0.4f}s")
+
+    @contextmanager
+    def span(self, name, **attributes):
+        if not self.enabled:
+            yield _NoSpan()
+            return
+        parent = _current.get()
+        span = Span(name, parent.span_id if parent else None, attributes)
+        token = _current.set(span)
+        start_ns = time.time_ns()
+        t1 = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - t1
+            _current.reset(token)
+            self.finish(span, start_ns, elapsed)
+
+    def finish(self, span, start_ns, elapsed):
+        with self._lock:
+            count, total, longest = self.totals.get(span.name, (0, 0.0, 0.0))
+            self.totals[span.name] = (count + 1, total + elapsed, max(longest, elapsed))
+            if self._file is None:
+                return
+            if self.format == "otlp":
+                record = self.otlp(span, start_ns, elapsed)
+            else:
+                record = {
+                    "trace_id": self.trace_id,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "start": start_ns / 1e9,
+                    "duration_ms": elapsed * 1000,
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.flush()
+
+    def otlp(self, span, start_ns, elapsed):
+        status = {"code": 1}
+        if span.error is not None:
+            status = {"code": 2, "message": span.error}
+        otlp_span = {
+            "traceId": self.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(elapsed * 1e9)),
+            "attributes": otlp_attributes(span.attributes),
+            "status": status,
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": otlp_attributes({"service.name": SERVICE_NAME})
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": SERVICE_NAME}, "spans": [otlp_span]}
+                    ],
+                }
+            ]
+        }
+
+
+def otlp_attributes(attributes):
+    converted = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            value = {"boolValue": value}
+        elif isinstance(value, int):
+            value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            value = {"doubleValue": value}
+        else:
+            value = {"stringValue": str(value)}
+        converted.append({"key": key, "value": value})
+    return converted
+
+
+tracer = Tracer()
+span = tracer.span
+
+
+@contextmanager
+def profiled(enabled, limit=30, stream=None):
+    """Run the block under cProfile and print the top functions."""
+    if not enabled:
+        yield
+        return
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        stats = pstats.Stats(profiler, stream=stream or sys.stderr)
+        stats.sort_stats("cumulative").print_stats(limit)
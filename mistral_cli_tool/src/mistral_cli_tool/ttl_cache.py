@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from mistral_cli_tool import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Thread-safe TTL cache with request coalescing.
+
+    `get_or_load(key, loader)` returns a fresh value from the cache, or calls
+    `loader()` once per key no matter how many threads miss at the same time
+    (single-flight). For `stale` seconds after expiry the old value is still
+    returned while one background refresh runs (stale-while-revalidate).
+    Failed loads are not cached. At most `max_entries` keys are kept, least
+    recently used first out.
+    """
+
+    def __init__(self, ttl, stale=0.0, max_entries=1024):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                age = now - loaded_at
+                if age < self.ttl:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return value
+                if age < self.ttl + self.stale:
+                    self.stale_hits += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        threading.Thread(
+                            target=self._load, args=(key, loader, flight), daemon=True
+                        ).start()
+                    return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if leader:
+            self._load(key, loader, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, key, loader, flight):
+        try:
+            flight.value = loader()
+        except Exception as e:
+            log.warning(f"cache load for {key!r} failed: {e!r}")
+            flight.error = e
+        with self._lock:
+            if flight.error is None:
+                self._entries[key] = (flight.value, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self.errors += 1
+            del self._flights[key]
+        flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "ttl": self.ttl,
+                "stale": self.stale,
+            }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Requests per second of todo_app's index, add and delete routes.
+
+Every thread logs in with its own Werkzeug test client and sends requests
+to one route for `--seconds`; the routes are measured one after the other,
+against a fresh database in a temporary directory that holds `--todos`
+tasks for each of them. Failed requests (500s, "database is locked") are
+counted apart.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import click
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from todo_app import app  # noqa: E402
+
+
+def login(client, name):
+    client.post("/register", data={"username": name, "password": "secret"})
+    client.post("/login", data={"username": name, "password": "secret"})
+
+
+def run_clients(send, threads, seconds, username=None):
+    """(count, errors) of `threads` logged-in clients calling `send`.
+
+    Client n logs in as user<n>, or all as `username`. `send(client, n, i)`
+    makes the i-th request of client n and returns the response and what it
+    counts for (1 request, or the tasks it adds).
+    """
+    counts = [[0, 0] for _ in range(threads)]
+    ready = threading.Barrier(threads + 1)
+
+    def worker(n):
+        client = app.test_client()
+        login(client, username or f"user{n}")
+        ready.wait()
+        deadline = time.perf_counter() + seconds
+        i = 0
+        while time.perf_counter() < deadline:
+            response, count = send(client, n, i)
+            if response.status_code >= 500:
+                counts[n][1] += 1
+            else:
+                counts[n][0] += count
+            i += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    ready.wait()
+    for thread in workers:
+        thread.join()
+    return sum(c[0] for c in counts), sum(c[1] for c in counts)
+
+
+def run(route, threads, seconds, todos):
+    def send(client, n, i):
+        if route == "index":
+            return client.get("/"), 1
+        if route == "add":
+            return client.post("/add", data={"todo": f"task from {n}"}), 1
+        # user n was seeded ids n * todos + 1 onwards
+        return client.get(f"/delete/{n * todos + 1 + i}"), 1
+
+    return run_clients(send, threads, seconds)
+
+
+@click.command()
+@click.option("--threads", default=8, show_default=True)
+@click.option("--seconds", default=5.0, show_default=True)
+@click.option("--todos", default=100, show_default=True, help="Per user")
+def main(threads, seconds, todos):
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    app.logger.disabled = True
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config["DATABASE"] = os.path.join(tmp, "todos.db")
+        for n in range(threads):
+            client = app.test_client()
+            login(client, f"user{n}")
+            tasks = "\n".join(f"seed task {i}" for i in range(todos))
+            client.post("/add_bulk", data={"todos": tasks})
+        for route in ("index", "add", "delete"):
+            ok, errors = run(route, threads, seconds, todos)
+            click.echo(
+                f"{route:6s} {threads} threads: {ok / seconds:8.1f} requests/s,"
+                f" {errors} errors"
+            )
+
+
+if __name__ == "__main__":
+    main()
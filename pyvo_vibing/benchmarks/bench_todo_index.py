@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Requests per second and p99 of todo_app's index page on a large list.
+
+One user owns `--todos` tasks and `--threads` clients request a page of
+`--limit` of them for `--seconds`, in three ways:
+
+- render: the fragment cache is off, every request queries and renders
+- cached: the rendered list comes from the fragment cache
+- 304: the clients send back the ETag, the page is not rendered at all
+"""
+
+import os
+import tempfile
+import time
+
+import click
+
+from bench_todo_app import app, run_clients
+from bench_todo_list import seed
+
+
+def measure(threads, seconds, url, conditional):
+    latencies = []
+    etags = {}
+
+    def send(client, n, i):
+        headers = {}
+        if conditional and etags.get(n):
+            headers["If-None-Match"] = etags[n]
+        t1 = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - t1)
+        etags[n] = response.headers.get("ETag")
+        return response, 1
+
+    ok, errors = run_clients(send, threads, seconds, username="user0")
+    latencies.sort()
+    return ok / seconds, latencies[int(len(latencies) * 0.99)] * 1000, errors
+
+
+@click.command()
+@click.option("--todos", default=100000, show_default=True)
+@click.option("--limit", default=500, show_default=True)
+@click.option("--threads", default=4, show_default=True)
+@click.option("--seconds", default=5.0, show_default=True)
+def main(todos, limit, threads, seconds):
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    app.logger.disabled = True
+    cache_size = app.config.get("FRAGMENT_CACHE_SIZE")
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, "todos.db"), todos, 1)
+        url = f"/?limit={limit}"
+        for mode in ("render", "cached", "304"):
+            if cache_size is not None:
+                app.config["FRAGMENT_CACHE_SIZE"] = (
+                    0 if mode == "render" else cache_size
+                )
+            rps, p99, errors = measure(threads, seconds, url, mode == "304")
+            click.echo(
+                f"{mode:7s} {threads} threads: {rps:7.1f} requests/s,"
+                f" p99 {p99:6.2f} ms, {errors} errors"
+            )
+
+
+if __name__ == "__main__":
+    main()
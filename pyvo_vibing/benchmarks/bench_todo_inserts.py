@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Tasks inserted per second by todo_app, one per request or in bulk.
+
+`--threads` logged-in test clients add tasks for `--seconds`, first one per
+POST /add, then `--batch` at a time per POST /add_bulk. Reports tasks/s,
+failed requests, and checks that every reported task is in the table.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import click
+
+from bench_todo_app import app, login, run_clients
+
+
+@click.command()
+@click.option("--threads", default=8, show_default=True)
+@click.option("--seconds", default=5.0, show_default=True)
+@click.option("--batch", default="10,100,1000", show_default=True)
+def main(threads, seconds, batch):
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    app.logger.disabled = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "todos.db")
+        app.config["DATABASE"] = path
+        login(app.test_client(), "seed")
+
+        def single(client, n, i):
+            return client.post("/add", data={"todo": f"task {i} from {n}"}), 1
+
+        added = 0
+        sizes = [1] + [int(b) for b in batch.split(",")]
+        for size in sizes:
+            tasks = "\n".join(f"task {i}" for i in range(size))
+
+            def bulk(client, n, i):
+                return client.post("/add_bulk", data={"todos": tasks}), size
+
+            ok, errors = run_clients(single if size == 1 else bulk, threads, seconds)
+            added += ok
+            route = "/add" if size == 1 else f"/add_bulk x{size}"
+            click.echo(
+                f"{route:16s} {threads} threads: {ok / seconds:9.1f} tasks/s,"
+                f" {errors} errors"
+            )
+        db = sqlite3.connect(path)
+        rows = db.execute("SELECT COUNT(*) FROM todos").fetchone()[0]
+        db.close()
+        click.echo(f"{rows} tasks in the table, {added} reported added")
+
+
+if __name__ == "__main__":
+    main()
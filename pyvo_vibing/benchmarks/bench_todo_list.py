@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Index page render time of todo_app as the todos table grows.
+
+The table is seeded straight through SQLite, up to each size of `--rows`
+in turn, with tasks spread round-robin over `--users` users. For each size,
+one user's first page and a page deep into their list (`?after=`) are
+requested `--requests` times, with the fragment cache off so that every
+request queries and renders; reports the mean and p99 in milliseconds.
+
+With `--db`, only seeds that file (to `--rows` tasks) and keeps it, to try
+the app on a large table: TODO_DB=big.db python todo_app.py, then log in as
+user0 / secret.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import click
+from werkzeug.security import generate_password_hash
+
+from bench_todo_app import app
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from todo_app import get_pool  # noqa: E402
+
+PASSWORD = "secret"
+
+
+def seed(path, rows, users, batch=100_000):
+    """Grow the todos table at `path` to `rows` tasks and `users` users."""
+    app.config["DATABASE"] = path
+    with app.app_context():
+        get_pool()
+    db = sqlite3.connect(path)
+    have = db.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    # one hash for all: seeding stays fast and logins cost what they would
+    password_hash = generate_password_hash(
+        PASSWORD, method=app.config["PASSWORD_HASH_METHOD"]
+    )
+    db.executemany(
+        "INSERT INTO users (username, password) VALUES (?, ?)",
+        [(f"user{n}", password_hash) for n in range(have, users)],
+    )
+    db.commit()
+    ids = [row[0] for row in db.execute("SELECT id FROM users ORDER BY id")]
+    count = db.execute("SELECT COUNT(*) FROM todos").fetchone()[0]
+    while count < rows:
+        size = min(batch, rows - count)
+        db.executemany(
+            "INSERT INTO todos (task, user_id) VALUES (?, ?)",
+            ((f"seed task {i}", ids[i % len(ids)]) for i in range(count, count + size)),
+        )
+        db.commit()
+        count += size
+    db.close()
+
+
+def timings(client, url, requests):
+    times = []
+    for _ in range(requests):
+        t1 = time.perf_counter()
+        response = client.get(url)
+        times.append(time.perf_counter() - t1)
+        assert response.status_code == 200, response.status_code
+    times.sort()
+    return sum(times) / len(times) * 1000, times[int(len(times) * 0.99)] * 1000
+
+
+@click.command()
+@click.option("--rows", default="10000,100000,1000000", show_default=True)
+@click.option("--users", default=100, show_default=True)
+@click.option("--requests", default=200, show_default=True)
+@click.option("--db", type=click.Path(dir_okay=False), help="Seed this file only")
+def main(rows, users, requests, db):
+    sizes = [int(r) for r in rows.split(",")]
+    if db:
+        seed(db, sizes[-1], users)
+        click.echo(f"seeded {db} with {sizes[-1]} tasks of {users} users")
+        return
+    app.config["FRAGMENT_CACHE_SIZE"] = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "todos.db")
+        for size in sizes:
+            seed(path, size, users)
+            client = app.test_client()
+            client.post("/login", data={"username": "user0", "password": PASSWORD})
+            first = timings(client, "/", requests)
+            # user0 owns every users-th task, so this skips most of them
+            deep = timings(client, f"/?after={size - size // 20}", requests)
+            click.echo(
+                f"{size:9d} rows: first page {first[0]:6.2f} ms"
+                f" (p99 {first[1]:6.2f}), deep page {deep[0]:6.2f} ms"
+                f" (p99 {deep[1]:6.2f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Login throughput of todo_app against the work factor and the user count.
+
+For each `--methods` work factor and each `--users` table size, a users
+table is seeded, then `--threads` test clients log in as random users for
+`--seconds` while one more client keeps requesting the index page. Reports
+logins/s and the index requests/s served meanwhile: logins should only get
+slower with the work factor, and the index should keep being served.
+"""
+
+import os
+import random
+import tempfile
+import threading
+import time
+
+import click
+
+from bench_todo_app import app, run_clients
+from bench_todo_list import PASSWORD, seed
+
+
+def index_load(stop, counts):
+    client = app.test_client()
+    client.post("/login", data={"username": "user0", "password": PASSWORD})
+    while not stop.is_set():
+        client.get("/")
+        counts[0] += 1
+
+
+@click.command()
+@click.option(
+    "--methods",
+    default="pbkdf2:sha256:10000,pbkdf2:sha256:100000,scrypt:32768:8:1",
+    show_default=True,
+)
+@click.option("--users", default="100,100000", show_default=True)
+@click.option("--threads", default=8, show_default=True)
+@click.option("--seconds", default=5.0, show_default=True)
+def main(methods, users, threads, seconds):
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    app.logger.disabled = True
+    for method in methods.split(","):
+        app.config["PASSWORD_HASH_METHOD"] = method
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "todos.db")
+            for count in [int(u) for u in users.split(",")]:
+                seed(path, 0, count)
+                users_count = count
+
+                def send(client, n, i):
+                    name = f"user{random.randrange(users_count)}"
+                    response = client.post(
+                        "/login", data={"username": name, "password": PASSWORD}
+                    )
+                    assert response.status_code == 302, response.get_data()
+                    return response, 1
+
+                stop = threading.Event()
+                index = [0]
+                loader = threading.Thread(target=index_load, args=(stop, index))
+                loader.start()
+                t1 = time.perf_counter()
+                logins, errors = run_clients(send, threads, seconds)
+                stop.set()
+                loader.join()
+                wall = time.perf_counter() - t1
+                click.echo(
+                    f"{method:22s} {count:7d} users: {logins / seconds:7.1f}"
+                    f" logins/s, index {index[0] / wall:6.1f} requests/s"
+                    f" meanwhile, {errors} errors"
+                )
+
+
+if __name__ == "__main__":
+    main()
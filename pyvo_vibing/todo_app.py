@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 from flask import Flask, render_template, request, redirect, url_for
-from flask import g
+from flask import g, make_response
 
 from functools import wraps
 from flask import session, redirect, url_for
@@ -9,7 +9,7 @@ from flask import session, redirect, url_for
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if "username" not in session:
+        if "user_id" not in session:
             return redirect(url_for("login"))
         return f(*args, **kwargs)
 
@@ -26,57 +26,286 @@ app = Flask(__name__)
 app.secret_key = "your_secret_key_here"
 
 
+import hashlib
+import hmac
+import queue
 import sqlite3
-
-
-def create_table():
-    db = sqlite3.connect("todos.db")
-    cursor = db.cursor()
-    cursor.execute(
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from markupsafe import Markup
+from werkzeug.security import check_password_hash, generate_password_hash
+
+app.config.setdefault("DATABASE", os.environ.get("TODO_DB", "todos.db"))
+# rendered todo lists kept in memory, 0 to render every time
+app.config.setdefault("FRAGMENT_CACHE_SIZE", 1024)
+
+# Werkzeug hash method, its parameters are the work factor; hashes made
+# with other parameters are redone at the next successful login
+app.config.setdefault(
+    "PASSWORD_HASH_METHOD", os.environ.get("TODO_PASSWORD_HASH", "scrypt:32768:8:1")
+)
+
+# applied to every new connection; WAL lets readers run next to one writer,
+# and writers wait for each other for up to busy_timeout ms instead of
+# failing with "database is locked"
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+
+class ConnectionPool:
+    """Open SQLite connections, reused across requests and threads.
+
+    The development server starts a thread per request, so connections are
+    kept in a pool rather than per thread. A reused connection keeps its
+    pragmas and its cache of prepared statements (sqlite3 caches
+    `cached_statements` of them per connection, keyed by the SQL text), so
+    a request neither reconnects nor recompiles its queries. At most
+    `max_idle` connections are kept between requests.
+    """
+
+    def __init__(self, path, max_idle=8):
+        self.path = path
+        self.idle = queue.LifoQueue(max_idle)
+
+    def connect(self):
+        db = sqlite3.connect(
+            self.path, timeout=5, check_same_thread=False, cached_statements=256
+        )
+        for pragma in PRAGMAS:
+            db.execute(pragma)
+        return db
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return self.connect()
+
+    def release(self, db):
+        if db.in_transaction:
+            db.rollback()
+        try:
+            self.idle.put_nowait(db)
+        except queue.Full:
+            db.close()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def create_table(db):
+    db.execute(
         """CREATE TABLE IF NOT EXISTS todos (
                         id INTEGER PRIMARY KEY,
-                        task TEXT NOT NULL)"""
+                        task TEXT NOT NULL,
+                        user_id INTEGER REFERENCES users (id))"""
+    )
+    columns = [row[1] for row in db.execute("PRAGMA table_info(todos)")]
+    if "user_id" not in columns:
+        db.execute("ALTER TABLE todos ADD COLUMN user_id INTEGER REFERENCES users (id)")
+    # a page of one user's todos is one range scan of this index
+    db.execute("CREATE INDEX IF NOT EXISTS todos_user_id ON todos (user_id, id)")
+    # tasks from before todos had owners were shared by everyone; they go to
+    # the oldest user rather than disappearing (with no users yet, at the
+    # first start after one has registered)
+    cursor = db.execute(
+        "UPDATE todos SET user_id = (SELECT min(id) FROM users)"
+        " WHERE user_id IS NULL AND EXISTS (SELECT 1 FROM users)"
     )
+    if cursor.rowcount > 0:
+        app.logger.warning(
+            f"{cursor.rowcount} tasks without an owner given to the oldest user"
+        )
     db.commit()
 
 
-def create_users_table():
-    db = sqlite3.connect("todos.db")
-    cursor = db.cursor()
-    cursor.execute(
+def create_users_table(db):
+    db.execute(
         """CREATE TABLE IF NOT EXISTS users (
                         id INTEGER PRIMARY KEY,
                         username TEXT NOT NULL,
                         password TEXT NOT NULL)"""
     )
+    columns = [row[1] for row in db.execute("PRAGMA table_info(users)")]
+    if "todos_version" not in columns:
+        # bumped by every change to the user's todos, see todos_version()
+        db.execute(
+            "ALTER TABLE users ADD COLUMN todos_version INTEGER NOT NULL DEFAULT 0"
+        )
+    try:
+        db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS users_username ON users (username)"
+        )
+    except sqlite3.IntegrityError:
+        # register_user still refuses taken names, see there
+        app.logger.warning(
+            "users has duplicate usernames, only the oldest of each can log in"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS users_username_dup ON users (username)")
     db.commit()
 
 
+def get_pool():
+    pool = app.extensions.get("todo_db")
+    if pool is None or pool.path != app.config["DATABASE"]:
+        pool = ConnectionPool(app.config["DATABASE"])
+        db = pool.acquire()
+        try:
+            create_users_table(db)
+            create_table(db)
+        finally:
+            pool.release(db)
+        app.extensions["todo_db"] = pool
+    return pool
+
+
 def get_db():
     if "db" not in g:
-        g.db = sqlite3.connect("todos.db")
+        g.db = get_pool().acquire()
         g.cursor = g.db.cursor()
     return g.db, g.cursor
 
 
 @app.teardown_appcontext
 def close_db(error):
-    if "db" in g:
-        g.db.close()
+    db = g.pop("db", None)
+    if db is not None:
+        g.pop("cursor").close()
+        get_pool().release(db)
 
 
-def get_todos():
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def get_todos(user_id, after=0, limit=DEFAULT_PAGE_SIZE):
+    """One page of the user's todos with ids above `after`, and the `after`
+    of the next page (None on the last one).
+
+    Keyset pagination: the page starts where the previous one ended in the
+    (user_id, id) index, so it costs the same on page 1 and page 10000, and
+    only its rows are read.
+    """
     db, cursor = get_db()
-    cursor.execute("SELECT * FROM todos")
+    cursor.execute(
+        "SELECT id, task FROM todos WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+        (user_id, after, limit + 1),
+    )
     rows = cursor.fetchall()
-    return [{"id": row[0], "task": row[1]} for row in rows]
+    todos = [{"id": row[0], "task": row[1]} for row in rows[:limit]]
+    next_after = todos[-1]["id"] if len(rows) > limit else None
+    return todos, next_after
+
+
+def load_templates():
+    """Compile every template now rather than in the first request that
+    uses it, and return a digest of their sources for the ETags."""
+    digest = hashlib.sha256()
+    for name in sorted(app.jinja_env.list_templates()):
+        app.jinja_env.get_template(name)
+        source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+        digest.update(source.encode())
+    return digest.hexdigest()[:16]
+
+
+TEMPLATES_DIGEST = load_templates()
+
+
+class FragmentCache:
+    """Rendered todo lists by (user_id, after, limit), least recently used
+    first, each with the todos_version it was rendered at.
+
+    An entry of an older version is never returned, so changes need no
+    invalidation beyond bumping the version. Each process has its own.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, html, max_entries):
+        if not max_entries:
+            return
+        with self.lock:
+            self.entries[key] = (version, html)
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+
+
+fragments = FragmentCache()
+
+
+def todos_version(user_id):
+    db, cursor = get_db()
+    cursor.execute("SELECT todos_version FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+    return 0 if row is None else row[0]
+
+
+def bump_todos_version(cursor, user_id):
+    # in the transaction of the change, so no page of the old todos can be
+    # served under the new version
+    cursor.execute(
+        "UPDATE users SET todos_version = todos_version + 1 WHERE id = ?",
+        (user_id,),
+    )
 
 
 @app.route("/")
 @login_required
 def index():
-    todos = get_todos()
-    return render_template("index.html", todos=todos)
+    after = request.args.get("after", 0, type=int)
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    user_id = session["user_id"]
+    # read before the todos: a page newer than its version is only
+    # rendered again, never served for a later version
+    version = todos_version(user_id)
+    etag = f"{user_id}.{version}.{after}.{limit}.{TEMPLATES_DIGEST}"
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        key = (user_id, after, limit)
+        todo_list = fragments.get(key, version)
+        if todo_list is None:
+            todos, next_after = get_todos(user_id, after, limit)
+            todo_list = Markup(
+                render_template(
+                    "_todo_list.html",
+                    todos=todos,
+                    after=after,
+                    next_after=next_after,
+                    limit=limit,
+                )
+            )
+            fragments.put(key, version, todo_list, app.config["FRAGMENT_CACHE_SIZE"])
+        response = make_response(render_template("index.html", todo_list=todo_list))
+    response.set_etag(etag)
+    # the browser keeps the page but asks every time, with If-None-Match
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
 
 
 @app.route("/add", methods=["POST"])
@@ -84,10 +313,26 @@ def index():
 def add_todo():
     db, cursor = get_db()
     todo = request.form["todo"]
-    cursor.execute("SELECT MAX(id) FROM todos")
-    max_id = cursor.fetchone()[0]
-    new_id = 1 if max_id is None else max_id + 1
-    cursor.execute("INSERT INTO todos (id, task) VALUES (?, ?)", (new_id, todo))
+    user_id = session["user_id"]
+    # the id is the rowid SQLite picks, in the same statement
+    cursor.execute("INSERT INTO todos (task, user_id) VALUES (?, ?)", (todo, user_id))
+    bump_todos_version(cursor, user_id)
+    db.commit()
+    return redirect(url_for("index"))
+
+
+@app.route("/add_bulk", methods=["POST"])
+@login_required
+def add_todos():
+    db, cursor = get_db()
+    user_id = session["user_id"]
+    tasks = [line.strip() for line in request.form["todos"].splitlines()]
+    # one transaction and one prepared statement for all of them
+    cursor.executemany(
+        "INSERT INTO todos (task, user_id) VALUES (?, ?)",
+        [(task, user_id) for task in tasks if task],
+    )
+    bump_todos_version(cursor, user_id)
     db.commit()
     return redirect(url_for("index"))
 
@@ -96,7 +341,10 @@ def add_todo():
 @login_required
 def delete_todo(index):
     db, cursor = get_db()
-    cursor.execute("DELETE FROM todos WHERE id = ?", (index,))
+    user_id = session["user_id"]
+    cursor.execute("DELETE FROM todos WHERE id = ? AND user_id = ?", (index, user_id))
+    if cursor.rowcount:
+        bump_todos_version(cursor, user_id)
     db.commit()
     return redirect(url_for("index"))
 
@@ -106,7 +354,8 @@ def register():
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
-        register_user(username, password)
+        if not register_user(username, password):
+            return "Username already taken"
         return redirect(url_for("login"))
     return render_template("register.html")
 
@@ -116,29 +365,91 @@ def login():
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
-        if login_user(username, password):
+        user_id = login_user(username, password)
+        if user_id is not None:
             session["username"] = username
+            session["user_id"] = user_id
             return redirect(url_for("index"))
         else:
             return "Invalid credentials"
     return render_template("login.html")
 
 
+# scrypt and PBKDF2 release the GIL, so other requests go on while a
+# password is hashed; this only stops more hashes than cores (each scrypt
+# one takes 32 MB) from running at once
+hashing = threading.BoundedSemaphore(os.cpu_count() or 1)
+
+
+def hash_password(password):
+    with hashing:
+        return generate_password_hash(
+            password, method=app.config["PASSWORD_HASH_METHOD"]
+        )
+
+
+# methods of the hashes made by hash_password, anything else is a password
+# stored in plaintext, from before passwords were hashed
+HASH_PREFIXES = ("scrypt:", "pbkdf2:")
+
+
+def check_password(password_hash, password):
+    if password_hash.startswith(HASH_PREFIXES) and password_hash.count("$") == 2:
+        try:
+            with hashing:
+                return check_password_hash(password_hash, password)
+        except ValueError:
+            pass  # a plaintext password that looks like a hash
+    return hmac.compare_digest(password_hash.encode(), password.encode())
+
+
+@lru_cache(maxsize=None)
+def dummy_hash(method):
+    return generate_password_hash("", method=method)
+
+
 def register_user(username, password):
+    # hashed before the write transaction, which would block other writers
+    password_hash = hash_password(password)
     db, cursor = get_db()
-    cursor.execute(
-        "INSERT INTO users (username, password) VALUES (?, ?)", (username, password)
-    )
+    # checked in the insert too: a database with duplicate usernames has no
+    # unique index to refuse them
+    try:
+        cursor.execute(
+            """INSERT INTO users (username, password) SELECT ?, ?
+               WHERE NOT EXISTS (SELECT 1 FROM users WHERE username = ?)""",
+            (username, password_hash, username),
+        )
+    except sqlite3.IntegrityError:
+        return False
     db.commit()
+    return cursor.rowcount == 1
 
 
 def login_user(username, password):
     db, cursor = get_db()
     cursor.execute(
-        "SELECT * FROM users WHERE username = ? AND password = ?", (username, password)
+        "SELECT id, password FROM users WHERE username = ? ORDER BY id LIMIT 1",
+        (username,),
     )
     user = cursor.fetchone()
-    return user is not None
+    method = app.config["PASSWORD_HASH_METHOD"]
+    if user is None:
+        # as slow as a wrong password, so timing does not tell who exists
+        check_password(dummy_hash(method), password)
+        return None
+    user_id, password_hash = user
+    if not check_password(password_hash, password):
+        return None
+    # Werkzeug fills in the parameters of a short method name ("scrypt"),
+    # so compare with what a hash made now starts with
+    if not password_hash.startswith(dummy_hash(method).split("$", 1)[0] + "$"):
+        cursor.execute(
+            "UPDATE users SET password = ? WHERE id = ?",
+            (hash_password(password), user_id),
+        )
+        db.commit()
+    return user_id
 
 
 if __name__ == "__main__":